@@ -1,14 +1,327 @@
+"""
+Prints the mean, median and mode of a list of numbers.
+
+Run with no arguments to type the numbers in one by one. Give a file name
+(or - for standard input) to read whitespace-separated numbers in chunks
+instead, in one pass and bounded memory:
+
+    python stats.py data.txt
+    python stats.py - --error 0.005 < data.txt
+
+The mean and variance are kept with Welford's method. As long as there
+are at most --exact-limit numbers they are also kept in a list, and the
+median and mode are exact. Past that the list is dropped: the median and
+other quantiles come from a KLL sketch whose rank error is about --error,
+and the mode from a Misra-Gries summary of at most --max-distinct values.
+"""
+import argparse
+import math
+import random
 import statistics
-n = int(input("Enter number of elements: "))
-numbers = []
-sum=0
-avg=0
-for i in range(n):
-    x = float(input("Enter elements: "))
-    numbers.append(x)
-for j in numbers:
-    sum = sum + j
-avg = sum/n
-print("The mean is: "+ str(avg))
-print("The median is: "+ str(statistics.median(numbers)))
-print("The mode is: "+ str(statistics.mode(numbers)))
+import sys
+from collections import Counter
+
+CHUNK_SIZE = 1 << 20    # Characters read at a time
+
+
+def readNumbers(fileObj, chunkSize = CHUNK_SIZE):
+    """
+    Yields lists of the numbers in a text file, one list per chunk read.
+    A number cut in two at the end of a chunk is joined with the rest of
+    it from the next one.
+
+    :param fileObj: An open text file.
+    :return: A generator of (numbers, skipped) pairs, where skipped counts
+             the words that are not finite numbers (nan, inf and the like).
+    """
+    carry = ""
+    while True:
+        text = fileObj.read(chunkSize)
+        if not text:
+            break
+        words = (carry + text).split()
+        carry = ""
+        if words and not text[-1].isspace():
+            carry = words.pop()
+        yield parseWords(words)
+    if carry:
+        yield parseWords([carry])
+
+
+def parseWords(words):
+    """
+    Converts words to floats.
+
+    :return: A (numbers, skipped) pair.
+    """
+    try:
+        numbers = list(map(float, words))
+    except ValueError:
+        numbers = []
+        for word in words:
+            try:
+                numbers.append(float(word))
+            except ValueError:
+                pass
+    if not math.isfinite(sum(numbers)):
+        # A nan or an infinity makes the sum non-finite, but so can large
+        # finite numbers overflowing it, so each number is checked
+        numbers = [x for x in numbers if math.isfinite(x)]
+    return numbers, len(words) - len(numbers)
+
+
+class RunningMoments:
+    """Count, mean, variance, minimum and maximum, updated a chunk at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0    # Sum of squared differences from the mean
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, numbers):
+        """
+        Adds a chunk of numbers. The chunk's own mean and sum of squares are
+        merged into the totals (Chan et al.'s form of Welford's method), so
+        the result is as accurate as adding them one at a time.
+        """
+        n = len(numbers)
+        if n == 0:
+            return
+        chunkSum = sum(numbers)
+        if math.isfinite(chunkSum):
+            chunkMean = chunkSum / n
+        else:
+            # The sum overflowed; dividing first keeps every term in range
+            chunkMean = sum(x / n for x in numbers)
+        chunkM2 = sum((x - chunkMean) * (x - chunkMean) for x in numbers)
+        if self.count == 0:
+            self.count, self.mean, self.m2 = n, chunkMean, chunkM2
+        else:
+            total = self.count + n
+            delta = chunkMean - self.mean
+            self.mean += delta * n / total
+            self.m2 += chunkM2 + delta * delta * self.count * n / total
+            self.count = total
+        self.minimum = min(self.minimum, min(numbers))
+        self.maximum = max(self.maximum, max(numbers))
+
+    def variance(self):
+        """Returns the sample variance, or None for fewer than two numbers."""
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+
+class QuantileSketch:
+    """
+    A KLL sketch: approximate quantiles of a stream in bounded memory.
+
+    Numbers are kept in levels. When a level holds more than its capacity
+    it is sorted and every other number, starting at a random one of the
+    first two, moves up a level, where it stands for twice as many. Lower
+    levels get smaller capacities, so the sketch holds about 3k numbers.
+    """
+
+    def __init__(self, error = 0.01, seed = None):
+        """
+        :param error: Target rank error, as a fraction of the count.
+        """
+        # Apache DataSketches' fit of KLL's rank error: 2.296 / k ** 0.9723
+        self.k = max(8, math.ceil((2.296 / error) ** (1 / 0.9723)))
+        self.levels = [[]]
+        self.random = random.Random(seed)
+
+    def capacity(self, level):
+        """Returns how many numbers the level may hold."""
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, numbers):
+        """Adds a chunk of numbers."""
+        self.levels[0].extend(numbers)
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items.sort()
+                keep = [items.pop()] if len(items) % 2 else []
+                self.levels[level + 1].extend(items[self.random.randint(0, 1)::2])
+                self.levels[level] = keep
+            level += 1
+
+    def size(self):
+        """Returns the number of numbers held."""
+        return sum(len(items) for items in self.levels)
+
+    def quantiles(self, fractions):
+        """
+        :param fractions: Fractions from 0 to 1, such as 0.5 for the median.
+        :return: The approximate quantile for each fraction, or None if no
+                 numbers have been added.
+        """
+        weighted = sorted((x, 1 << level) for level, items in enumerate(self.levels) for x in items)
+        if not weighted:
+            return [None] * len(fractions)
+        totalWeight = sum(weight for x, weight in weighted)
+        results = []
+        for fraction in fractions:
+            target = fraction * totalWeight
+            cumulative = 0
+            for x, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(x)
+        return results
+
+
+class ModeCounter:
+    """
+    Counts values to find the mode. Counts are exact until more than
+    maxDistinct different values have been seen. From then on the summary
+    is pruned like a Misra-Gries counter: every count drops by the
+    (maxDistinct + 1)th largest and values left at zero are forgotten, so
+    a value that makes up more than 1 / (maxDistinct + 1) of the stream is
+    always kept.
+    """
+
+    def __init__(self, maxDistinct = 100000):
+        self.maxDistinct = maxDistinct
+        self.counts = Counter()
+        self.exact = True
+
+    def update(self, numbers):
+        """Adds a chunk of numbers."""
+        self.counts.update(numbers)
+        if len(self.counts) > self.maxDistinct:
+            self.exact = False
+            cut = sorted(self.counts.values(), reverse = True)[self.maxDistinct]
+            self.counts = Counter({x: c - cut for x, c in self.counts.items() if c > cut})
+
+    def mode(self):
+        """Returns the most common value, the first seen on a tie while exact."""
+        if not self.counts:
+            return None
+        return self.counts.most_common(1)[0][0]
+
+
+def streamStats(chunks, error = 0.01, exactLimit = 1000000, maxDistinct = 100000, fractions = (0.25, 0.75)):
+    """
+    Computes statistics in one pass.
+
+    :param chunks: Lists of numbers, such as the first items of readNumbers().
+    :return: A dictionary of the results. "exact" is True when the median
+             and quantiles were computed from every number, and "modeExact"
+             when the mode was. An approximate mode is None if no value
+             stood out from the rest.
+    """
+    moments = RunningMoments()
+    sketch = QuantileSketch(error)
+    modes = ModeCounter(maxDistinct)
+    kept = []
+    for numbers in chunks:
+        moments.update(numbers)
+        sketch.update(numbers)
+        modes.update(numbers)
+        if kept is not None:
+            if moments.count <= exactLimit:
+                kept.extend(numbers)
+            else:
+                kept = None
+
+    results = {"count": moments.count, "mean": moments.mean if moments.count else None,
+               "variance": moments.variance(), "min": moments.minimum if moments.count else None,
+               "max": moments.maximum if moments.count else None,
+               "exact": kept is not None, "modeExact": modes.exact, "error": error}
+    if kept:
+        # Before sorting, so that a tie goes to the value seen first
+        results["mode"] = statistics.mode(kept)
+        results["modeExact"] = True
+        kept.sort()
+        results["median"] = statistics.median(kept)
+        if not math.isfinite(results["median"]):
+            # The two middle numbers overflowed when added; halve them first
+            results["median"] = kept[(len(kept) - 1) // 2] / 2 + kept[len(kept) // 2] / 2
+        results["quantiles"] = {q: kept[max(0, math.ceil(q * len(kept)) - 1)] for q in fractions}
+    else:
+        values = sketch.quantiles([0.5] + list(fractions))
+        results["median"] = values[0]
+        results["quantiles"] = dict(zip(fractions, values[1:]))
+        results["mode"] = modes.mode()
+    return results
+
+
+def printStats(results):
+    """Prints the results of streamStats()."""
+    approximate = " (approximate, rank error about {:.2%})".format(results["error"])
+    print("Read " + str(results["count"]) + " numbers")
+    print("The mean is: " + str(results["mean"]))
+    print("The variance is: " + str(results["variance"]))
+    print("The median is: " + str(results["median"]) + ("" if results["exact"] else approximate))
+    for fraction, value in results["quantiles"].items():
+        print("The {:g} quantile is: ".format(fraction) + str(value) + ("" if results["exact"] else approximate))
+    print("The minimum is: " + str(results["min"]))
+    print("The maximum is: " + str(results["max"]))
+    if results["mode"] == None:
+        print("There is no mode")
+    else:
+        print("The mode is: " + str(results["mode"]) + ("" if results["modeExact"] else " (approximate)"))
+
+
+def interactive():
+    """Reads the numbers with input(), as the original script did."""
+    n = int(input("Enter number of elements: "))
+    numbers = []
+    sum=0
+    avg=0
+    for i in range(n):
+        x = float(input("Enter elements: "))
+        numbers.append(x)
+    for j in numbers:
+        sum = sum + j
+    avg = sum/n
+    print("The mean is: "+ str(avg))
+    print("The median is: "+ str(statistics.median(numbers)))
+    print("The mode is: "+ str(statistics.mode(numbers)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("file", nargs = "?", help = "file of numbers, or - for standard input")
+    parser.add_argument("--error", type = float, default = 0.01, help = "target quantile rank error (default 0.01)")
+    parser.add_argument("--exact-limit", type = int, default = 1000000,
+                        help = "keep up to this many numbers for exact results (default 1000000)")
+    parser.add_argument("--max-distinct", type = int, default = 100000,
+                        help = "distinct values counted exactly for the mode (default 100000)")
+    args = parser.parse_args()
+
+    if args.file == None:
+        interactive()
+        return
+    skipped = [0]
+
+    def chunks(fileObj):
+        for numbers, bad in readNumbers(fileObj):
+            skipped[0] += bad
+            yield numbers
+
+    if args.file == "-":
+        results = streamStats(chunks(sys.stdin), args.error, args.exact_limit, args.max_distinct)
+    else:
+        try:
+            with open(args.file, 'r') as fileObj:
+                results = streamStats(chunks(fileObj), args.error, args.exact_limit, args.max_distinct)
+        except FileNotFoundError:
+            print(f"Error: File {args.file} not found.")
+            return
+    printStats(results)
+    if skipped[0]:
+        print("Skipped " + str(skipped[0]) + " words that are not finite numbers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+File: accountbench.py
+This module compares the time and memory needed to build a
+bank of synthetic accounts three ways: createBank() with
+accounts that keep their fields in a dictionary, as
+SavingsAccount did before __slots__; createBank() with the
+current SavingsAccount; and createBankBulk().
+
+Memory is measured with tracemalloc on a smaller bank, since
+tracing slows every allocation, and reported per account.
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from bank import TEST_NAMES, Bank, createBank, createBankBulk, numpy
+from savingsaccount import SavingsAccount
+
+class DictSavingsAccount:
+    """This class is a savings account whose fields live in a
+    per-object dictionary, for comparison with SavingsAccount."""
+
+    def __init__(self, name, pin, balance = 0.0):
+        self.name = name
+        self.pin = pin
+        self.balance = balance
+
+    getName = SavingsAccount.getName
+    getPin = SavingsAccount.getPin
+    getBalance = SavingsAccount.getBalance
+
+def createDictBank(numAccounts = 1):
+    """Returns a bank built as createBank() does, but of
+    DictSavingsAccount objects."""
+    bank = Bank()
+    for pinNumber in range(1000, numAccounts + 1000):
+        name = random.choice(TEST_NAMES)
+        balance = float(random.randint(100, 1000))
+        bank.add(DictSavingsAccount(name, str(pinNumber), balance))
+    return bank
+
+BUILDERS = (("dict accounts", createDictBank),
+            ("slotted accounts", createBank),
+            ("bulk generator", createBankBulk))
+
+def timeBuild(build, size):
+    """Returns the seconds taken to build a bank of size accounts."""
+    gc.collect()
+    start = time.perf_counter()
+    bank = build(size)
+    elapsed = time.perf_counter() - start
+    del bank
+    return elapsed
+
+def bytesPerAccount(build, size):
+    """Returns the memory held by a bank of size accounts,
+    divided by size."""
+    gc.collect()
+    tracemalloc.start()
+    bank = build(size)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del bank
+    return current / size
+
+def benchmark(sizes = (100000, 1000000, 10000000), loopLimit = 1000000, memorySize = 100000):
+    """Prints build times for banks of the given sizes and the
+    memory per account of each representation.  The two
+    one-account-at-a-time builders are skipped above loopLimit
+    accounts."""
+    print("NumPy" if numpy != None else "random.choices (NumPy is not installed)")
+    print("%-18s %14s" % ("", "bytes/account") +
+          "".join("%14s" % ("%d (s)" % size) for size in sizes))
+    for label, build in BUILDERS:
+        row = "%-18s %14.0f" % (label, bytesPerAccount(build, memorySize))
+        for size in sizes:
+            if build != createBankBulk and size > loopLimit:
+                row += "%14s" % "skipped"
+            else:
+                row += "%14.3f" % timeBuild(build, size)
+        print(row)
+
+def main():
+    """Runs the benchmark; sizes may be given on the command line."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000, 10000000]
+    benchmark(sizes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+File: accountfile.py
+This module defines a compact binary file format for savings
+accounts and the AccountFile class, which reads it lazily.
+
+The file holds a header, one fixed-width record per account
+(name, PIN and balance) and a hash index from "name/PIN" keys
+to record numbers, optionally followed by a pickled dictionary
+of per-account interest rates.  AccountFile maps the file into memory, so
+opening it reads only the header, and get() touches only the
+index slots and the record it needs.
+"""
+import mmap
+import os
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+from savingsaccount import SavingsAccount
+
+MAGIC = b"BANKACCT"
+VERSION = 1
+
+# Magic, version, generation, record count, index slots, index offset
+HEADER = struct.Struct("<8sIQQQQ")
+
+# Name and PIN as NUL-padded UTF-8, balance as a double
+RECORD = struct.Struct("<32s16sd")
+
+def makeKey(name, pin):
+    """Returns the key for the account, as Bank.makeKey does."""
+    return name + "/" + pin
+
+def _encode(text, size, field):
+    data = text.encode("utf-8")
+    if len(data) > size:
+        raise ValueError(field + " is longer than " + str(size) + " bytes: " + repr(text))
+    return data
+
+def _hash(key):
+    return zlib.crc32(key.encode("utf-8"))
+
+def isAccountFile(fileName):
+    """Returns True if the file is in this binary format."""
+    with open(fileName, 'rb') as fileObj:
+        return fileObj.read(len(MAGIC)) == MAGIC
+
+def writeAccounts(fileName, accounts, generation = 0, rates = None):
+    """Writes the accounts to a binary account file.  A later
+    account with the same name and PIN replaces an earlier one.
+    rates is an optional dictionary of interest rates by key,
+    stored after the index.
+    The file is written under a temporary name and renamed into
+    place, so a reader never sees a half-written file."""
+    tempName = fileName + ".tmp"
+    numbers = {}    # key -> record number
+    with open(tempName, 'wb') as fileObj:
+        fileObj.write(bytes(HEADER.size))
+        for account in accounts:
+            name, pin = account.getName(), account.getPin()
+            record = RECORD.pack(_encode(name, 32, "Name"), _encode(pin, 16, "PIN"),
+                                 float(account.getBalance()))
+            key = makeKey(name, pin)
+            if key in numbers:
+                fileObj.seek(HEADER.size + numbers[key] * RECORD.size)
+                fileObj.write(record)
+                fileObj.seek(0, os.SEEK_END)
+            else:
+                numbers[key] = len(numbers)
+                fileObj.write(record)
+
+        # Open addressing with linear probing; 0 marks an empty
+        # slot, so slots hold record number + 1
+        slots = 8
+        while slots < 2 * len(numbers):
+            slots *= 2
+        index = array('I', bytes(4 * slots))
+        for key, number in numbers.items():
+            slot = _hash(key) & (slots - 1)
+            while index[slot]:
+                slot = (slot + 1) & (slots - 1)
+            index[slot] = number + 1
+        if sys.byteorder == "big":
+            index.byteswap()
+        indexOffset = fileObj.tell()
+        fileObj.write(index.tobytes())
+        if rates:
+            fileObj.write(pickle.dumps(dict(rates), pickle.HIGHEST_PROTOCOL))
+
+        fileObj.seek(0)
+        fileObj.write(HEADER.pack(MAGIC, VERSION, generation, len(numbers), slots, indexOffset))
+        fileObj.flush()
+        os.fsync(fileObj.fileno())
+    os.replace(tempName, fileName)
+    return len(numbers)
+
+class AccountFile:
+    """This class reads a binary account file through a
+    memory map, building SavingsAccount objects only for
+    the records that are asked for."""
+
+    def __init__(self, fileName):
+        """Opens the file and reads its header."""
+        self.fileName = fileName
+        self._fileObj = open(fileName, 'rb')
+        self._data = mmap.mmap(self._fileObj.fileno(), 0, access = mmap.ACCESS_READ)
+        (magic, version, self.generation, self.count,
+         self.slots, self.indexOffset) = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(fileName + " is not a version " + str(VERSION) + " account file")
+
+    def __len__(self):
+        """Returns the number of accounts."""
+        return self.count
+
+    def __iter__(self):
+        """Yields every account in file order."""
+        for number in range(self.count):
+            yield SavingsAccount(*self._record(number))
+
+    def _record(self, number):
+        """Returns the name, PIN and balance of a record."""
+        name, pin, balance = RECORD.unpack_from(self._data, HEADER.size + number * RECORD.size)
+        return name.rstrip(b"\0").decode("utf-8"), pin.rstrip(b"\0").decode("utf-8"), balance
+
+    def rates(self):
+        """Returns the dictionary of interest rates by key stored
+        after the index, or {} if there is none."""
+        end = self.indexOffset + 4 * self.slots
+        if len(self._data) <= end:
+            return {}
+        return pickle.loads(self._data[end:])
+
+    def get(self, name, pin):
+        """Returns the account, or None if it is not in the file."""
+        key = makeKey(name, pin)
+        slot = _hash(key) & (self.slots - 1)
+        while True:
+            entry, = struct.unpack_from("<I", self._data, self.indexOffset + 4 * slot)
+            if entry == 0:
+                return None
+            record = self._record(entry - 1)
+            if record[0] == name and record[1] == pin:
+                return SavingsAccount(*record)
+            slot = (slot + 1) & (self.slots - 1)
+
+    def keys(self):
+        """Yields the key of every account in file order."""
+        for number in range(self.count):
+            name, pin, balance = self._record(number)
+            yield makeKey(name, pin)
+
+    def close(self):
+        """Releases the memory map and the file."""
+        self._data.close()
+        self._fileObj.close()
+
+def readPickledAccounts(fileName, rates = None):
+    """Yields the accounts of a file written by Bank.save(),
+    skipping the snapshot header that Bank.compact() writes.
+    If rates is a dictionary, the file's interest rates are
+    added to it."""
+    with open(fileName, 'rb') as fileObj:
+        while True:
+            try:
+                account = pickle.load(fileObj)
+            except EOFError:
+                return
+            if not isinstance(account, tuple):
+                yield account
+            elif account[0] == "rates" and rates != None:
+                rates.update(account[1])
+
+def convert(pickleName, binaryName):
+    """Converts a file of pickled accounts to the binary
+    format and returns the number of accounts written.
+    A journaled bank should be compacted first, since its
+    journal is not read."""
+    rates = {}    # Filled as the file is read, before writeAccounts() needs it
+    return writeAccounts(binaryName, readPickledAccounts(pickleName, rates), rates = rates)
+
+def main():
+    """Converts the pickle file named on the command line."""
+    if len(sys.argv) != 3:
+        print("Usage: python accountfile.py <pickled bank file> <binary account file>")
+        return
+    count = convert(sys.argv[1], sys.argv[2])
+    print("Wrote", count, "accounts to", sys.argv[2])
+
+if __name__ == "__main__":
+    main()
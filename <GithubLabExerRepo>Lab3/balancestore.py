@@ -0,0 +1,231 @@
+"""
+File: balancestore.py
+This module defines the BalanceStore class, which keeps the
+balances and interest rates of many savings accounts in two
+columns lined up with the account keys, so month-end interest
+for every account is one vectorized operation.
+
+NumPy float64 arrays are used when NumPy is installed; without
+it the columns are array('d') and interest is posted in a loop.
+"""
+import random
+import sys
+import time
+from array import array
+from savingsaccount import SavingsAccount
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def makeColumn(size = 0, value = 0.0):
+    """Returns a column of size floats, all set to value."""
+    if numpy != None:
+        return numpy.full(size, value, dtype = numpy.float64)
+    return array('d', [value]) * size
+
+def postInterest(balances, rates):
+    """Adds balance * rate to every balance and returns the
+    total interest paid.  rates is a column of the same length
+    or a single rate for all accounts."""
+    if numpy != None:
+        interest = numpy.multiply(balances, rates)
+        balances += interest
+        return float(interest.sum())
+    if isinstance(rates, (int, float)):
+        rates = array('d', [rates]) * len(balances)
+    total = 0.0
+    for i in range(len(balances)):
+        interest = balances[i] * rates[i]
+        balances[i] += interest
+        total += interest
+    return total
+
+class StoredAccount(SavingsAccount):
+    """This class is a SavingsAccount whose balance and rate
+    live in a BalanceStore.  Deposits and withdrawals through
+    it change the store's columns.  It pickles as a plain
+    SavingsAccount, so files and journals never hold a store."""
+
+    __slots__ = ("store",)
+
+    def __init__(self, store, name, pin):
+        self.store = store
+        self.name = name
+        self.pin = pin
+
+    def __reduce__(self):
+        return (SavingsAccount, (self.name, self.pin, self.balance))
+
+    def _position(self):
+        return self.store.positions[self.store.makeKey(self.name, self.pin)]
+
+    @property
+    def balance(self):
+        return float(self.store.balanceColumn()[self._position()])
+
+    @balance.setter
+    def balance(self, value):
+        self.store.balanceColumn()[self._position()] = value
+
+    def getRate(self):
+        """Returns this account's interest rate."""
+        return float(self.store.rateColumn()[self._position()])
+
+    def computeInterest(self):
+        """Computes, deposits, and returns the interest at this account's rate."""
+        interest = self.balance * self.getRate()
+        if interest > 0:
+            self.balance += interest
+        return interest
+
+class BalanceStore:
+    """This class holds accounts as a list of keys and two
+    float columns, balance and rate, in the same order.
+    Removing an account moves the last one into its place,
+    so the columns stay dense."""
+
+    def __init__(self):
+        """Creates an empty store."""
+        self.keys = []          # position -> "name/pin"
+        self.positions = {}     # "name/pin" -> position
+        self._balances = makeColumn()
+        self._rates = makeColumn()
+
+    def __len__(self):
+        """Returns the number of accounts."""
+        return len(self.keys)
+
+    def makeKey(self, name, pin):
+        """Returns a key for the account, as Bank.makeKey does."""
+        return name + "/" + pin
+
+    def balanceColumn(self):
+        """Returns the balances, one per key, as a NumPy array
+        or array('d').  Changes to it change the accounts."""
+        if numpy == None:
+            return self._balances   # Kept at exactly one entry per key
+        return self._balances[:len(self.keys)]
+
+    def rateColumn(self):
+        """Returns the interest rates, one per key."""
+        if numpy == None:
+            return self._rates
+        return self._rates[:len(self.keys)]
+
+    def add(self, account, rate = None):
+        """Adds the account's balance to the store, replacing an
+        account with the same name and PIN.  rate defaults to
+        SavingsAccount.RATE."""
+        if rate == None:
+            rate = SavingsAccount.RATE
+        key = self.makeKey(account.getName(), account.getPin())
+        position = self.positions.get(key)
+        if position == None:
+            position = len(self.keys)
+            self.keys.append(key)
+            self.positions[key] = position
+            if numpy != None:
+                if position == len(self._balances):
+                    # Grow by doubling so adding n accounts copies O(n) values in all
+                    self._balances = numpy.resize(self._balances, max(16, 2 * position))
+                    self._rates = numpy.resize(self._rates, max(16, 2 * position))
+            else:
+                self._balances.append(0.0)
+                self._rates.append(0.0)
+        self._balances[position] = account.getBalance()
+        self._rates[position] = rate
+
+    def get(self, name, pin):
+        """Returns a StoredAccount for the account, or None if
+        the account does not exist."""
+        if self.makeKey(name, pin) not in self.positions:
+            return None
+        return StoredAccount(self, name, pin)
+
+    def remove(self, name, pin):
+        """Removes the account and returns it as a plain
+        SavingsAccount, or None if it does not exist."""
+        key = self.makeKey(name, pin)
+        position = self.positions.pop(key, None)
+        if position == None:
+            return None
+        account = SavingsAccount(name, pin, float(self._balances[position]))
+        last = len(self.keys) - 1
+        if position != last:
+            lastKey = self.keys[last]
+            self.keys[position] = lastKey
+            self.positions[lastKey] = position
+            self._balances[position] = self._balances[last]
+            self._rates[position] = self._rates[last]
+        self.keys.pop()
+        if numpy == None:
+            self._balances.pop()
+            self._rates.pop()
+        return account
+
+    def setRate(self, name, pin, rate):
+        """Sets one account's interest rate."""
+        self._rates[self.positions[self.makeKey(name, pin)]] = rate
+
+    def computeInterest(self, rates = None):
+        """Posts interest to every account at its own rate, or at
+        the given rate or column of rates, and returns the total."""
+        return postInterest(self.balanceColumn(), self.rateColumn() if rates is None else rates)
+
+    def accounts(self):
+        """Yields every account as a plain SavingsAccount."""
+        balances = self.balanceColumn()
+        for position, key in enumerate(self.keys):
+            name, slash, pin = key.rpartition("/")
+            yield SavingsAccount(name, pin, float(balances[position]))
+
+def storeFromAccounts(accounts, rate = None):
+    """Returns a BalanceStore holding the accounts, such as a
+    bank's accounts.values() or an AccountFile."""
+    store = BalanceStore()
+    for account in accounts:
+        store.add(account, rate)
+    return store
+
+# Functions for testing
+
+def benchmark(sizes = (1000000, 10000000), objectLimit = 1000000):
+    """Times month-end interest for banks of the given sizes,
+    posted one SavingsAccount at a time (up to objectLimit
+    accounts) and as one operation on a column."""
+    print("NumPy" if numpy != None else "array('d') (NumPy is not installed)")
+    print("%12s %14s %14s %10s" % ("accounts", "objects (s)", "column (s)", "speed-up"))
+    for size in sizes:
+        if numpy != None:
+            balances = numpy.random.default_rng(1).integers(100, 1001, size).astype(numpy.float64)
+        else:
+            balances = array('d', (float(random.randint(100, 1000)) for i in range(size)))
+        rates = makeColumn(size, SavingsAccount.RATE)
+
+        objectTime = None
+        if size <= objectLimit:
+            accounts = [SavingsAccount("Ken", str(i), float(balances[i])) for i in range(size)]
+            start = time.perf_counter()
+            for account in accounts:
+                account.computeInterest()
+            objectTime = time.perf_counter() - start
+            del accounts
+
+        start = time.perf_counter()
+        postInterest(balances, rates)
+        columnTime = time.perf_counter() - start
+
+        if objectTime == None:
+            print("%12d %14s %14.4f %10s" % (size, "skipped", columnTime, "-"))
+        else:
+            print("%12d %14.4f %14.4f %9.1fx" % (size, objectTime, columnTime, objectTime / columnTime))
+
+def main():
+    """Runs the benchmark; sizes may be given on the command line."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000000, 10000000]
+    benchmark(sizes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+File: roster.py
+This module defines the Roster class, which keeps Student
+objects in order by name and then grade.
+
+Student compares by name through __lt__, so list.sort() makes
+a Python method call for every comparison and cannot rank by
+grade.  Roster sorts with key functions instead: each key is
+computed once per student and the comparisons run in C.  Python's
+sort is stable, so students with the same name and grade keep
+the order in which they were added.
+"""
+import bisect
+import csv
+import heapq
+import random
+import sys
+import time
+from collections import Counter
+from operator import attrgetter
+from student import Student
+
+byName = attrgetter("name")
+byGrade = attrgetter("grade")
+byNameAndGrade = attrgetter("name", "grade")
+
+class Roster:
+    """This class represents a roster of students, kept
+    sorted by name and then grade."""
+
+    def __init__(self, students = ()):
+        """Creates a roster holding the given students."""
+        self.students = sorted(students, key = byNameAndGrade)
+
+    def __len__(self):
+        """Returns the number of students."""
+        return len(self.students)
+
+    def __iter__(self):
+        """Iterates over the students by name and then grade."""
+        return iter(self.students)
+
+    def add(self, student):
+        """Adds one student in its place, after any students
+        with the same name and grade."""
+        bisect.insort_right(self.students, student, key = byNameAndGrade)
+
+    def addAll(self, students):
+        """Adds many students with one sort, which is faster
+        than calling add() for each."""
+        self.students.extend(students)
+        self.students.sort(key = byNameAndGrade)
+
+    def find(self, name):
+        """Returns the students with the given name, lowest
+        grade first, using binary search."""
+        low = bisect.bisect_left(self.students, name, key = byName)
+        high = bisect.bisect_right(self.students, name, lo = low, key = byName)
+        return self.students[low:high]
+
+    def sortedBy(self, *fields, reverse = False):
+        """Returns the students sorted by the given fields, as
+        in sortedBy("grade", "name").  Ties keep roster order."""
+        return sorted(self.students, key = attrgetter(*fields), reverse = reverse)
+
+    def byGrade(self):
+        """Returns the students highest grade first, and by
+        name within a grade."""
+        # The roster is already in name order and the sort is
+        # stable, so one pass on grade gives both orders
+        return sorted(self.students, key = byGrade, reverse = True)
+
+    def top(self, k):
+        """Returns the k students with the highest grades, best
+        first, without sorting the whole roster.  Ties go to
+        the earlier name."""
+        return heapq.nlargest(k, self.students, key = byGrade)
+
+    def histogram(self, width = 10):
+        """Returns a list of (low, count) pairs, one per band of
+        grades from low up to low + width that has students."""
+        counts = Counter(int(student.grade // width) * width for student in self.students)
+        return sorted(counts.items())
+
+    def writeHistogram(self, fileName, width = 10):
+        """Writes the histogram to a CSV file with low, high and
+        count columns."""
+        with open(fileName, "w", newline = "") as fileObj:
+            writer = csv.writer(fileObj)
+            writer.writerow(["low", "high", "count"])
+            for low, count in self.histogram(width):
+                writer.writerow([low, low + width, count])
+
+# Functions for testing
+
+def makeStudents(number, seed = None):
+    """Returns a list of students with random names and
+    grades from 50 to 100."""
+    generator = random.Random(seed)
+    names = ["Student" + str(i) for i in range(max(1, number // 4))]
+    return [Student(generator.choice(names), generator.randint(50, 100))
+            for i in range(number)]
+
+def benchmark(sizes = (10000, 100000, 500000), k = 10):
+    """Times ordering and lookups on rosters of the given
+    sizes: list.sort() through Student.__lt__ against Roster's
+    key sort, a full sort by grade against top(k), and a
+    linear scan against find()."""
+    print("%10s %12s %12s %12s %12s %12s %12s" %
+          ("students", "__lt__ (s)", "Roster (s)", "sort k (s)",
+           "top k (s)", "scan (s)", "find (s)"))
+    for size in sizes:
+        students = makeStudents(size, 1)
+        name = students[size // 2].name
+
+        start = time.perf_counter()
+        sorted(students)
+        richTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        roster = Roster(students)
+        keyTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sorted(students, key = byGrade, reverse = True)[:k]
+        sortTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        roster.top(k)
+        topTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        [student for student in students if student.name == name]
+        scanTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        roster.find(name)
+        findTime = time.perf_counter() - start
+
+        print("%10d %12.4f %12.4f %12.4f %12.4f %12.4f %12.6f" %
+              (size, richTime, keyTime, sortTime, topTime, scanTime, findTime))
+
+def main():
+    """Shows a small roster, then runs the benchmark; sizes
+    may be given on the command line."""
+    roster = Roster([Student("Adrian", 100), Student("Ian", 99), Student("Wise", 100),
+                     Student("Tavion", 95), Student("JM", 80), Student("Adrian", 98)])
+    for student in roster:
+        print(student.name, student.grade)
+    print("Top 3:", [(s.name, s.grade) for s in roster.top(3)])
+    print("Adrian:", [s.grade for s in roster.find("Adrian")])
+    print("Histogram:", roster.histogram())
+    print("")
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 500000]
+    benchmark(sizes)
+
+if __name__ == "__main__":
+    main()
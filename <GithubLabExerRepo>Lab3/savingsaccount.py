@@ -9,11 +9,30 @@ class SavingsAccount:
 
     RATE = 0.02    # Single rate for all accounts
 
+    # Fixed slots instead of a per-object __dict__, which saves
+    # memory in banks with millions of accounts
+    __slots__ = ("name", "pin", "balance")
+
     def __init__(self, name, pin, balance = 0.0):
         self.name = name
         self.pin = pin
         self.balance = balance
 
+    def __getstate__(self):
+        """Pickles as a plain dictionary, the same state that
+        accounts had before __slots__, so files stay readable
+        by either version."""
+        return {"name": self.name, "pin": self.pin, "balance": self.balance}
+
+    def __setstate__(self, state):
+        """Restores a pickled account.  Older pickles hold a
+        dictionary; slot-only pickles hold (None, slots)."""
+        if isinstance(state, tuple):
+            dictState, slotState = state
+            state = dict(dictState or {}, **(slotState or {}))
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self):
         """Returns the string rep."""
         result =  'Name:    ' + self.name + '\n' 
@@ -58,5 +77,6 @@ class SavingsAccount:
     def computeInterest(self):
         """Computes, deposits, and returns the interest."""
         interest = self.balance * SavingsAccount.RATE
-        self.deposit(interest)
+        if interest > 0:
+            self.balance += interest    # As deposit() does, without building its message
         return interest
@@ -0,0 +1,204 @@
+"""
+File: transactions.py
+This module defines the TransactionEngine class, which applies
+a feed of deposits, withdrawals and transfers to a Bank from
+several threads at once.
+
+Accounts are guarded by a fixed number of shard locks chosen by
+a hash of the account key.  A transfer takes the locks of both
+accounts in shard order, so two transfers can never wait on each
+other.  Every operation is routed to the worker that owns the
+shard of its (source) account, which keeps withdrawals from one
+account in feed order.  Each operation returns a Result with a
+Status code instead of a message string.
+
+Feeds are CSV files with a header row:
+    kind,name,pin,amount,to_name,to_pin
+    deposit,Ken,1000,50,,
+    transfer,Ken,1000,25,Molly,1001
+"""
+import contextlib
+import csv
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+from enum import IntEnum
+from bank import Bank, createBank
+
+class Status(IntEnum):
+    """The outcome of one operation."""
+    OK = 0
+    NOT_FOUND = 1
+    INVALID_AMOUNT = 2
+    INSUFFICIENT_FUNDS = 3
+    UNKNOWN_OPERATION = 4
+    ERROR = 5    # The operation raised an exception
+
+# toName and toPin are only used by transfers
+Transaction = namedtuple("Transaction", ["kind", "name", "pin", "amount", "toName", "toPin"])
+Transaction.__new__.__defaults__ = (None, None)
+
+# balance is the (source) account's balance afterwards, or None
+Result = namedtuple("Result", ["transaction", "status", "balance"])
+
+def readFeed(fileName):
+    """Yields the transactions of a CSV feed.  Amounts that are
+    not numbers are read as NaN and rejected as invalid."""
+    with open(fileName, newline = "") as fileObj:
+        for row in csv.DictReader(fileObj):
+            try:
+                amount = float(row["amount"])
+            except (TypeError, ValueError):
+                amount = float("nan")
+            yield Transaction(row["kind"].strip().lower(), row["name"], row["pin"], amount,
+                              row.get("to_name") or None, row.get("to_pin") or None)
+
+def writeFeed(fileName, transactions):
+    """Writes transactions to a CSV feed."""
+    with open(fileName, "w", newline = "") as fileObj:
+        writer = csv.writer(fileObj)
+        writer.writerow(["kind", "name", "pin", "amount", "to_name", "to_pin"])
+        for t in transactions:
+            writer.writerow([t.kind, t.name, t.pin, t.amount, t.toName or "", t.toPin or ""])
+
+class TransactionEngine:
+    """This class applies transactions to a bank concurrently."""
+
+    def __init__(self, bank, shards = 64):
+        """Creates the engine with the given number of shard locks."""
+        self.bank = bank
+        self.locks = [threading.Lock() for i in range(shards)]
+
+    def shardOf(self, name, pin):
+        """Returns the shard number of an account."""
+        return zlib.crc32(self.bank.makeKey(name, pin).encode("utf-8")) % len(self.locks)
+
+    def apply(self, transaction):
+        """Applies one transaction and returns its Result."""
+        t = transaction
+        if t.kind not in ("deposit", "withdraw", "transfer"):
+            return Result(t, Status.UNKNOWN_OPERATION, None)
+        if not t.amount > 0:
+            return Result(t, Status.INVALID_AMOUNT, None)
+        if t.name == None or t.pin == None:
+            return Result(t, Status.NOT_FOUND, None)
+        if t.kind == "transfer" and (t.toName == None or t.toPin == None):
+            return Result(t, Status.NOT_FOUND, None)
+
+        shards = {self.shardOf(t.name, t.pin)}
+        if t.kind == "transfer":
+            shards.add(self.shardOf(t.toName, t.toPin))
+        shards = sorted(shards)    # One global order, so no deadlocks
+        for shard in shards:
+            self.locks[shard].acquire()
+        try:
+            # A journaled bank has one journal, so its changes are written one at a time
+            with self.bank.journalLock if self.bank.journal else contextlib.nullcontext():
+                return self._applyLocked(t)
+        finally:
+            for shard in reversed(shards):
+                self.locks[shard].release()
+
+    def _applyLocked(self, t):
+        account = self.bank.get(t.name, t.pin)
+        if account == None:
+            return Result(t, Status.NOT_FOUND, None)
+        if t.kind == "deposit":
+            self.bank.deposit(t.name, t.pin, t.amount)
+        else:
+            if account.getBalance() < t.amount:
+                return Result(t, Status.INSUFFICIENT_FUNDS, account.getBalance())
+            if t.kind == "withdraw":
+                self.bank.withdraw(t.name, t.pin, t.amount)
+            elif self.bank.get(t.toName, t.toPin) == None:
+                return Result(t, Status.NOT_FOUND, account.getBalance())
+            else:
+                self.bank.transfer(t.name, t.pin, t.toName, t.toPin, t.amount)
+        return Result(t, Status.OK, account.getBalance())
+
+    def run(self, transactions, workers = 4):
+        """Applies the transactions on the given number of
+        threads and returns their Results in feed order."""
+        transactions = list(transactions)
+        results = [None] * len(transactions)
+        queues = [[] for i in range(workers)]
+        for index, t in enumerate(transactions):
+            shard = 0 if t.name == None or t.pin == None else self.shardOf(t.name, t.pin)
+            queues[shard % workers].append(index)
+
+        def work(indexes):
+            # One bad operation must not stop the rest of this worker's queue
+            for index in indexes:
+                try:
+                    results[index] = self.apply(transactions[index])
+                except Exception:
+                    results[index] = Result(transactions[index], Status.ERROR, None)
+
+        threads = [threading.Thread(target = work, args = (queue,)) for queue in queues]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+def summarize(results):
+    """Returns a dictionary counting the results by status."""
+    counts = {status.name: 0 for status in Status}
+    for result in results:
+        counts[result.status.name] += 1
+    return counts
+
+# Functions for testing
+
+def makeFeed(bank, size):
+    """Returns a random feed of transactions on the bank's accounts."""
+    keys = [key.split("/") for key in bank.accounts]
+    feed = []
+    for i in range(size):
+        name, pin = random.choice(keys)
+        kind = random.choice(("deposit", "withdraw", "transfer"))
+        amount = float(random.randint(1, 300))
+        if kind == "transfer":
+            toName, toPin = random.choice(keys)
+            feed.append(Transaction(kind, name, pin, amount, toName, toPin))
+        else:
+            feed.append(Transaction(kind, name, pin, amount))
+    return feed
+
+def benchmark(accounts = 10000, size = 200000, workerCounts = (1, 2, 4, 8)):
+    """Reports operations per second for each worker count,
+    starting from the same bank each time."""
+    random.seed(1)
+    feed = makeFeed(createBank(accounts), size)
+    print("%8s %12s %10s" % ("workers", "ops/sec", "seconds"))
+    for workers in workerCounts:
+        random.seed(1)
+        bank = createBank(accounts)
+        engine = TransactionEngine(bank)
+        start = time.perf_counter()
+        results = engine.run(feed, workers)
+        elapsed = time.perf_counter() - start
+        print("%8d %12.0f %10.3f" % (workers, len(results) / elapsed, elapsed))
+    print(summarize(results))
+
+def main():
+    """Applies a CSV feed to a pickled bank file and saves it:
+        python transactions.py bank.dat feed.csv [workers]
+    With no arguments, runs the benchmark instead."""
+    if len(sys.argv) < 3:
+        benchmark()
+        return
+    bank = Bank(sys.argv[1])
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    start = time.perf_counter()
+    results = TransactionEngine(bank).run(readFeed(sys.argv[2]), workers)
+    elapsed = time.perf_counter() - start
+    bank.save()
+    print(summarize(results))
+    print("%d operations in %.3f s (%.0f ops/sec)" % (len(results), elapsed, len(results) / max(elapsed, 1e-9)))
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,175 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, Flask, current_app, render_template, stream_template, request, redirect, url_for, flash, session, Response, g, has_app_context, jsonify
+from flask import before_render_template, template_rendered
+from flask import send_from_directory
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+import click
+import gzip
+import json
+import mimetypes
 import os
+import re
+import threading
+import time
+import zlib
+from collections import namedtuple
 from datetime import datetime, timedelta
+from functools import wraps
+from werkzeug.utils import safe_join
+from dbprofile import apply_sqlite_pragmas, engine_options
+from deadline_import import reader_for
+from leaderboard import PointsRanking
+from metrics import COUNT_BUCKETS, Registry
+from pagecache import PageCache
+from passwords import PasswordHasher
 
-app = Flask(__name__)
+# The templates are kept in Templates/Templates here; a deployment may copy them to the usual "templates" folder
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_FOLDER = "templates" if os.path.isfile(os.path.join(BASE_DIR, "templates", "login.html")) else os.path.join("Templates", "Templates")
 
-# Set up database
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///users.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SECRET_KEY"] = os.urandom(24)  # Needed for flash messages & sessions
+# Used until scripts/build_css.py has built the self-hosted stylesheet
+TAILWIND_CDN_URL = "https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css"
+ASSET_FALLBACKS = {"site.css": TAILWIND_CDN_URL}
 
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
+db = SQLAlchemy()
+
+# Pages and `flask` commands; create_app() registers them under the same URLs and command names
+site = Blueprint("site", __name__, cli_group=None)
+
+metrics_registry = Registry()
+REQUEST_SECONDS = metrics_registry.histogram(
+    "studying_request_seconds", "Time spent handling a request.", ["route"])
+REQUEST_SQL_STATEMENTS = metrics_registry.histogram(
+    "studying_request_sql_statements", "SQL statements run per request.", ["route"], buckets=COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = metrics_registry.histogram(
+    "studying_request_sql_seconds", "Time spent running SQL per request.", ["route"])
+BCRYPT_SECONDS = metrics_registry.histogram(
+    "studying_bcrypt_seconds", "Time spent hashing or checking passwords.", ["operation"])
+TEMPLATE_SECONDS = metrics_registry.histogram(
+    "studying_template_render_seconds", "Time spent rendering templates.", ["template"])
+
+# One per process; create_app() applies its settings
+password_hasher = PasswordHasher(observe=lambda operation, seconds: BCRYPT_SECONDS.observe(seconds, operation))
+
+class SiteState:
+    """Caches that belong to one app. create_app() keeps them in app.extensions,
+    so apps on different databases never serve each other's pages or users."""
+
+    def __init__(self, app):
+        self.page_cache = PageCache(app.config["PAGE_CACHE_MAX_BYTES"])
+        self.points_ranking = PointsRanking()
+        self.user_cache = {}  # user_id -> (expires_at, UserSnapshot)
+        self.user_cache_lock = threading.Lock()
+        self.asset_manifest = load_asset_manifest(app.static_folder)  # "site.css" -> "css/site.<hash>.css"
+
+def site_state():
+    """The current app's SiteState."""
+    return current_app.extensions["studying_site"]
+
+def create_app(config=None):
+    """Builds the site. Settings start from the defaults below, then any
+    FLASK_-prefixed environment variable overrides its key (FLASK_PAGE_SIZE=100,
+    FLASK_SQLALCHEMY_ENGINE_OPTIONS__pool_size=16), then `config` if given.
+    Tables are not created here; run `flask init-db` once per database."""
+    app = Flask(__name__, template_folder=TEMPLATE_FOLDER)
+
+    # Set up database
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///users.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # "default" or "concurrent" (WAL, busy timeout, larger cache); see dbprofile.py
+    app.config["DB_PROFILE"] = os.environ.get("DB_PROFILE", "default")
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY")  # Needed for flash messages & sessions; see load_secret_key()
+
+    # Pagination for the calendar and history tables
+    app.config["PAGE_SIZE"] = 50
+    app.config["MAX_PAGE_SIZE"] = 500
+    app.config["STREAM_TABLES"] = False  # Stream whole tables instead of paging (also ?stream=1)
+    app.config["CALENDAR_API_MAX_DAYS"] = 366  # Widest window /api/calendar will return
+
+    # Seconds between background reminder sweeps when running app.py directly (0 disables)
+    app.config["NOTIFICATION_SWEEP_INTERVAL"] = 300
+
+    # Seconds a user lookup may be reused across requests (0 keeps it per request only)
+    app.config["USER_CACHE_TTL"] = 0
+    app.config["QUERY_COUNT_HEADER"] = False  # Adds X-Query-Count to responses, for tests
+
+    # bcrypt work factor, and worker processes for hashing (0 hashes on the request thread)
+    app.config["BCRYPT_LOG_ROUNDS"] = 12
+    app.config["BCRYPT_WORKERS"] = 0
+
+    # Memory budget for rendered dashboard/calendar/history pages (0 disables the cache)
+    app.config["PAGE_CACHE_MAX_BYTES"] = 16 * 1024 * 1024
+
+    # Seconds before the leaderboard ranking is reloaded to pick up other workers' changes
+    app.config["LEADERBOARD_REFRESH"] = 60
+
+    # Bulk deadline import: largest accepted upload and rows per INSERT batch
+    app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024
+    app.config["IMPORT_BATCH_SIZE"] = 500
+
+    # Instrumentation: /metrics endpoint, and logging of requests slower than this many ms (0 disables)
+    app.config["METRICS_ENABLED"] = True
+    app.config["SLOW_REQUEST_MS"] = 0
+
+    # History older than this many days is moved to per-user gzip files by `flask archive-history`
+    app.config["HISTORY_HOT_DAYS"] = 365
+    app.config["HISTORY_ARCHIVE_DIR"] = os.path.join(app.instance_path, "history_archive")
+
+    app.config.from_prefixed_env()
+    app.config.update(config or {})
+    # The profile's pool settings, with any set through the environment taking precedence
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options(app.config["DB_PROFILE"]),
+                                               **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+    if not app.config["SECRET_KEY"]:
+        app.config["SECRET_KEY"] = load_secret_key(os.path.join(app.instance_path, "secret_key"))
+
+    db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config["DB_PROFILE"])
+    password_hasher.rounds = app.config["BCRYPT_LOG_ROUNDS"]
+    password_hasher.workers = app.config["BCRYPT_WORKERS"]
+    app.extensions["studying_site"] = SiteState(app)
+
+    before_render_template.connect(start_template_timer, app)
+    template_rendered.connect(record_template_time, app)
+    app.register_blueprint(site)
+    return app
+
+def load_asset_manifest(static_folder):
+    """Reads the names of the built, content-hashed assets, or {} before the first build."""
+    try:
+        with open(os.path.join(static_folder, "manifest.json")) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def load_secret_key(path):
+    """Returns the session signing key stored at `path`, creating it on first
+    use so every worker process and restart signs sessions with the same key.
+    A new key is written to a temporary file and linked into place, so
+    workers starting together all read the same complete key."""
+    try:
+        with open(path, "rb") as file:
+            key = file.read()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}"
+    with open(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as file:
+        file.write(os.urandom(32))
+    try:
+        os.link(temporary, path)
+    except FileExistsError:
+        pass  # Another worker created it first; use theirs
+    finally:
+        os.remove(temporary)
+    with open(path, "rb") as file:
+        return file.read()
 
 # Define User model
 class User(db.Model):
@@ -20,7 +177,7 @@ class User(db.Model):
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
-    points = db.Column(db.Integer, default=0)  # New column to track points
+    points = db.Column(db.Integer, default=0, index=True)  # New column to track points
     rank = db.Column(db.String(20), default="Bronze")  # New column for ranking
 
 class Deadline(db.Model):
@@ -33,24 +190,121 @@ class Deadline(db.Model):
     notified = db.Column(db.Boolean, default=False)  # NEW COLUMN
     user = db.relationship("User", backref=db.backref("deadlines", lazy=True))
 
+    # Composite indexes matching the calendar, priority filter and reminder lookups
+    __table_args__ = (
+        db.Index("ix_deadline_user_due", "user_id", "due_date"),
+        db.Index("ix_deadline_user_priority_due", "user_id", "priority", "due_date"),
+        db.Index("ix_deadline_user_due_notified", "user_id", "due_date", "notified"),
+        db.Index("ix_deadline_due_notified", "due_date", "notified"),  # Reminder sweep across all users
+    )
+
     def __repr__(self):
         return f"<Deadline {self.title} - {'Completed' if self.completed else 'Pending'}>"
 
     user = db.relationship("User", backref=db.backref("deadlines", lazy=True))
 
-def check_deadline_notifications(user_id):
-    user_id = session["user_id"]
+class DeadlineStats(db.Model):
+    # Per-user counters so progress is a primary key lookup instead of a full scan
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    # Bumped whenever anything shown on the user's pages changes; keys the page cache and ETags
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+def get_deadline_stats(user_id):
+    """Returns the counter row for the user, backfilling it with a single
+    COUNT/SUM aggregate for users created before the counters existed.
+    Change the counters with SQL expressions (stats.total = DeadlineStats.total + 1)
+    so concurrent requests add to each other's updates instead of overwriting them."""
+    stats = db.session.get(DeadlineStats, user_id)
+    if stats is None:
+        counts = db.select(
+            db.literal(user_id),
+            db.func.count(Deadline.id),
+            db.func.coalesce(db.func.sum(db.case((Deadline.completed, 1), else_=0)), 0),
+            db.literal(0),
+        ).where(Deadline.user_id == user_id)
+        # One statement, and a no-op when another request has just created the row
+        db.session.execute(
+            sqlite_insert(DeadlineStats)
+            .from_select(["user_id", "total", "completed", "version"], counts)
+            .on_conflict_do_nothing(index_elements=["user_id"])
+        )
+        stats = db.session.get(DeadlineStats, user_id)
+    return stats
+
+class Notification(db.Model):
+    # Per-user reminder inbox filled by the sweeper, so the dashboard only reads
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    deadline_id = db.Column(db.Integer, nullable=False)  # No FK: deadlines are deleted when archived
+    title = db.Column(db.String(100), nullable=False)
+    priority = db.Column(db.String(10), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    read = db.Column(db.Boolean, default=False, nullable=False)
+    created_on = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_notification_user_read_due", "user_id", "read", "due_date"),
+    )
+
+def sweep_deadline_notifications():
+    """Marks every deadline due today or tomorrow, for all users, as notified and copies
+    it into the notification inbox. SQLite's RETURNING cannot feed an INSERT,
+    so this uses one INSERT ... SELECT and one UPDATE on the same criteria in a
+    single transaction; the write lock taken by the INSERT keeps them in step.
+    Today is included so a deadline due tomorrow that is added after a day's
+    sweep is still picked up by the next one. Returns the number of new
+    notifications."""
     today = datetime.today().date()
-    tomorrow = today + timedelta(days=1)
+    criteria = (Deadline.due_date.between(today, today + timedelta(days=1)), Deadline.notified.is_(False))
+
+    # The new reminders change these users' dashboards
+    db.session.execute(
+        db.update(DeadlineStats)
+        .where(DeadlineStats.user_id.in_(db.select(Deadline.user_id).where(*criteria)))
+        .values(version=DeadlineStats.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.select(Deadline.user_id, Deadline.id, Deadline.title, Deadline.priority, Deadline.due_date).where(*criteria)
+    db.session.execute(
+        db.insert(Notification).from_select(["user_id", "deadline_id", "title", "priority", "due_date"], rows)
+    )
+    notified = db.session.execute(
+        db.update(Deadline).where(*criteria).values(notified=True).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return notified
+
+def start_notification_sweeper(app, interval):
+    """Runs the sweep every `interval` seconds on a daemon thread."""
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    sweep_deadline_notifications()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Notification sweep failed")
+            time.sleep(interval)
 
-    upcoming_deadlines = Deadline.query.filter_by(user_id=user_id, due_date=tomorrow, notified=False).all()
+    thread = threading.Thread(target=run, name="notification-sweeper", daemon=True)
+    thread.start()
+    return thread
 
-    # Mark them as notified
-    for deadline in upcoming_deadlines:
-        deadline.notified = True
-    db.session.commit()  # ✅ Fixed missing commit
+@site.cli.command("sweep-notifications")
+def sweep_notifications_command():
+    """Create reminders for every deadline due today or tomorrow (schedule this at least daily)."""
+    notified = sweep_deadline_notifications()
+    click.echo(f"Created {notified} reminder(s).")
 
-    return upcoming_deadlines
+def get_unread_notifications(user_id):
+    """Returns the user's unread reminders for deadlines that are not yet past."""
+    return Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.read.is_(False),
+        Notification.due_date >= datetime.today().date(),
+    ).order_by(Notification.due_date, Notification.id).all()
 
 class History(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -62,11 +316,227 @@ class History(db.Model):
 
     user = db.relationship("User", backref=db.backref("history", lazy=True))
 
-@app.route("/", methods=["GET", "POST"])
+    # Serves the history page: filter by user, newest completion first
+    __table_args__ = (
+        db.Index("ix_history_user_completed", "user_id", "completed_on"),
+    )
+
+# Points awarded for completing a deadline of each priority
+PRIORITY_POINTS = {"High": 20, "Medium": 15, "Low": 10}
+
+class HistoryRollup(db.Model):
+    # Archived deadlines per user, month and priority, kept up to date as rows
+    # reach History so summaries read one row per month instead of every row
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM" of completed_on
+    priority = db.Column(db.String(10), primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+def priority_points(priority):
+    """SQL expression for the points a deadline of the given priority column earns."""
+    return db.case(PRIORITY_POINTS, value=priority, else_=0)
+
+def _add_to_rollups(insert):
+    """Runs an INSERT of (user_id, month, priority, completed, points) rows
+    into HistoryRollup, adding onto the counts of rows that already exist."""
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=["user_id", "month", "priority"],
+        set_={"completed": HistoryRollup.completed + insert.excluded.completed,
+              "points": HistoryRollup.points + insert.excluded.points},
+    ))
+
+def ensure_indexes():
+    """Creates any declared index missing from an existing database.
+    db.create_all() only builds indexes for new tables, so older users.db
+    files need this; indexes that already exist are skipped."""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+@site.cli.command("init-db")
+def init_db_command():
+    """Create the tables and indexes (run once before starting the workers)."""
+    db.create_all()
+    created = ensure_indexes()
+    click.echo(f"Database ready at {db.engine.url}" + (f"; created indexes: {', '.join(created)}." if created else "."))
+
+@site.cli.command("init-indexes")
+def init_indexes_command():
+    """Create missing indexes on an existing database."""
+    db.create_all()
+    created = ensure_indexes()
+    click.echo(f"Created indexes: {', '.join(created)}" if created else "All indexes already exist.")
+
+def _archive_deadlines(*criteria):
+    """Copies the matching deadlines into History and deletes them using one
+    INSERT ... SELECT and one DELETE, without building a Python object per row,
+    and adds them to the monthly rollups with one grouped upsert.
+    Returns the number of rows moved; the caller owns the transaction."""
+    db.session.flush()
+    rollups = db.select(
+        Deadline.user_id,
+        db.literal(datetime.today().strftime("%Y-%m")),
+        Deadline.priority,
+        db.func.count(Deadline.id),
+        db.func.sum(priority_points(Deadline.priority)),
+    ).where(*criteria).group_by(Deadline.user_id, Deadline.priority)
+    _add_to_rollups(sqlite_insert(HistoryRollup).from_select(
+        ["user_id", "month", "priority", "completed", "points"], rollups))
+
+    rows = db.select(
+        Deadline.user_id,
+        Deadline.title,
+        Deadline.due_date,
+        Deadline.priority,
+        db.literal(datetime.today().date(), History.completed_on.type),
+    ).where(*criteria)
+    db.session.execute(
+        db.insert(History).from_select(["user_id", "title", "due_date", "priority", "completed_on"], rows)
+    )
+    return db.session.execute(db.delete(Deadline).where(*criteria)).rowcount
+
+def archive_completed_deadlines(user_id):
+    """Moves the user's completed deadlines to History and updates their counters."""
+    stats = get_deadline_stats(user_id)
+    moved = _archive_deadlines(Deadline.user_id == user_id, Deadline.completed.is_(True))
+    stats.total = DeadlineStats.total - moved
+    stats.completed = DeadlineStats.completed - moved
+    stats.version = DeadlineStats.version + 1
+    return moved
+
+def archive_stale_deadlines(days):
+    """Moves completed deadlines that were due more than `days` days ago to
+    History for every user at once, adjusting all counters in one UPDATE."""
+    cutoff = datetime.today().date() - timedelta(days=days)
+    criteria = (Deadline.completed.is_(True), Deadline.due_date < cutoff)
+
+    moved_for_user = db.select(db.func.count(Deadline.id)).where(
+        Deadline.user_id == DeadlineStats.user_id, *criteria
+    ).scalar_subquery()
+    db.session.execute(
+        db.update(DeadlineStats)
+        .where(DeadlineStats.user_id.in_(db.select(Deadline.user_id).where(*criteria)))
+        .values(total=DeadlineStats.total - moved_for_user, completed=DeadlineStats.completed - moved_for_user,
+                version=DeadlineStats.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    moved = _archive_deadlines(*criteria)
+    db.session.commit()
+    return moved
+
+@site.cli.command("archive-deadlines")
+@click.option("--days", default=30, show_default=True, help="Archive completed deadlines due more than this many days ago.")
+def archive_deadlines_command(days):
+    """Batch-archive old completed deadlines for all users."""
+    moved = archive_stale_deadlines(days)
+    click.echo(f"Archived {moved} completed deadline(s) older than {days} day(s).")
+
+def history_archive_path(user_id):
+    return os.path.join(current_app.config["HISTORY_ARCHIVE_DIR"], f"{user_id}.jsonl.gz")
+
+def archive_old_history(days):
+    """Moves History rows completed more than `days` days ago into per-user
+    gzip JSON Lines files, then deletes them from the table. Each run appends
+    one gzip member to the user's file. The file is synced before the rows are
+    deleted, so a crash in between repeats rows in the file instead of losing
+    them. The rollups already count these rows and are left as they are."""
+    cutoff = datetime.combine(datetime.today().date() - timedelta(days=days), datetime.min.time())
+    os.makedirs(current_app.config["HISTORY_ARCHIVE_DIR"], exist_ok=True)
+    user_ids = db.session.scalars(db.select(History.user_id).where(History.completed_on < cutoff).distinct()).all()
+    moved = 0
+    for user_id in user_ids:
+        criteria = (History.user_id == user_id, History.completed_on < cutoff)
+        rows = db.session.execute(
+            db.select(History.title, History.due_date, History.priority, History.completed_on)
+            .where(*criteria).order_by(History.completed_on, History.id)
+            .execution_options(yield_per=1000)
+        )
+        with open(history_archive_path(user_id), "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as file:
+                for title, due_date, priority, completed_on in rows:
+                    record = {"title": title, "due_date": due_date.isoformat(), "priority": priority,
+                              "completed_on": completed_on.isoformat(sep=" ")}
+                    file.write((json.dumps(record) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        moved += db.session.execute(db.delete(History).where(*criteria)).rowcount
+        get_deadline_stats(user_id).version = DeadlineStats.version + 1
+        db.session.commit()
+    return moved
+
+def read_archived_history(user_id):
+    """Yields the user's cold-archived history rows as dictionaries, oldest
+    first, decompressing the file as it is read."""
+    path = history_archive_path(user_id)
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+@site.cli.command("archive-history")
+@click.option("--days", default=None, type=int, help="Move history completed more than this many days ago (default: HISTORY_HOT_DAYS).")
+def archive_history_command(days):
+    """Move old history rows to compressed per-user files."""
+    days = current_app.config["HISTORY_HOT_DAYS"] if days is None else days
+    moved = archive_old_history(days)
+    click.echo(f"Moved {moved} history row(s) older than {days} day(s) to {current_app.config['HISTORY_ARCHIVE_DIR']}.")
+
+def rebuild_history_rollups():
+    """Recomputes every rollup from the History table and the cold-archive
+    files, for databases that had history before the rollups existed."""
+    db.session.execute(db.delete(HistoryRollup))
+    month = db.func.strftime("%Y-%m", History.completed_on)
+    rollups = db.select(
+        History.user_id, month, History.priority, db.func.count(History.id), db.func.sum(priority_points(History.priority))
+    ).where(db.true()).group_by(History.user_id, month, History.priority)
+    _add_to_rollups(sqlite_insert(HistoryRollup).from_select(
+        ["user_id", "month", "priority", "completed", "points"], rollups))
+
+    archive_dir = current_app.config["HISTORY_ARCHIVE_DIR"]
+    for name in os.listdir(archive_dir) if os.path.isdir(archive_dir) else []:
+        user_id = name.partition(".")[0]
+        if not user_id.isdigit():
+            continue
+        counts = {}
+        for record in read_archived_history(int(user_id)):
+            key = (record["completed_on"][:7], record["priority"])
+            completed, points = counts.get(key, (0, 0))
+            counts[key] = (completed + 1, points + PRIORITY_POINTS.get(record["priority"], 0))
+        if counts:
+            _add_to_rollups(sqlite_insert(HistoryRollup).values([
+                {"user_id": int(user_id), "month": month, "priority": priority, "completed": completed, "points": points}
+                for (month, priority), (completed, points) in counts.items()
+            ]))
+
+    # Any user's history summary may have changed
+    db.session.execute(
+        db.update(DeadlineStats)
+        .values(version=DeadlineStats.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+@site.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the monthly history rollups."""
+    db.create_all()
+    rebuild_history_rollups()
+    click.echo(f"Rebuilt {db.session.query(HistoryRollup).count()} rollup row(s).")
+
+@site.route("/", methods=["GET", "POST"])
 def signup():
     if "user_id" in session:  # Redirect logged-in users
         flash("You are already signed in!", "info")
-        return redirect(url_for("dashboard"))
+        return redirect(url_for(".dashboard"))
 
     if request.method == "POST":
         try:
@@ -78,28 +548,31 @@ def signup():
             # Ensure all fields are filled
             if not name or not email or not password or not confirm_password:
                 flash("All fields are required!", "danger")
-                return redirect(url_for("signup"))
+                return redirect(url_for(".signup"))
 
             # Check if user already exists
             existing_user = User.query.filter_by(email=email).first()
             if existing_user:
                 flash("Email already registered. Please log in.", "warning")
-                return redirect(url_for("login"))
+                return redirect(url_for(".login"))
 
             # Check if passwords match
             if password != confirm_password:
                 flash("Passwords do not match!", "danger")
-                return redirect(url_for("signup"))
+                return redirect(url_for(".signup"))
 
             # Hash password and create user
-            hashed_password = bcrypt.generate_password_hash(password).decode("utf-8")
+            hashed_password = password_hasher.hash(password)
             new_user = User(name=name, email=email, password=hashed_password)
 
             db.session.add(new_user)
             db.session.commit()
+            ranking = site_state().points_ranking
+            if ranking.loaded_at is not None:
+                ranking.add(0)
 
             flash("Sign-up successful! 🎉 Please log in.", "success")
-            return redirect(url_for("login"))
+            return redirect(url_for(".login"))
 
         except Exception as e:
             db.session.rollback()  # Rollback in case of error
@@ -109,7 +582,7 @@ def signup():
     return render_template("signup.html")
 
 # Route for login
-@app.route("/login", methods=["GET", "POST"])
+@site.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         email = request.form.get("email")
@@ -117,71 +590,270 @@ def login():
 
         # Check if user exists
         user = User.query.filter_by(email=email).first()
-        if user and bcrypt.check_password_hash(user.password, password):
+        if user and password and password_hasher.check(user.password, password):
+            # Upgrade hashes made with an older work factor while we have the plain password
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(password)
+                db.session.commit()
             session["user_id"] = user.id  # Store user ID in session
             session["user_name"] = user.name  # Store user name in session
             flash(f"Welcome back, {user.name}! 🎉", "success")
-            return redirect(url_for("dashboard"))  # Redirect to dashboard
+            return redirect(url_for(".dashboard"))  # Redirect to dashboard
         else:
             flash("Invalid email or password. Please try again.", "danger")
 
     return render_template("login.html")
 
-def update_user_rank(user):
-    if user.points >= 500:
-        user.rank = "Platinum Puller"
-    elif user.points >= 400:
-        user.rank = "Emerald Edger"
-    elif user.points >= 200:
-        user.rank = "Gold Gooner"
-    elif user.points >= 100:
-        user.rank = "Silver Stroker"
-    elif user.points >= 50:
-        user.rank = "Bronze Beater"
+def rank_for_points(points):
+    if points >= 500:
+        return "Platinum Puller"
+    elif points >= 400:
+        return "Emerald Edger"
+    elif points >= 200:
+        return "Gold Gooner"
+    elif points >= 100:
+        return "Silver Stroker"
+    elif points >= 50:
+        return "Bronze Beater"
     else:
-        user.rank = "Unranked"
+        return "Unranked"
+
+def update_user_rank(user):
+    """Recomputes the rank after a points change. The caller commits."""
+    user.rank = rank_for_points(user.points or 0)
     session["rank"] = user.rank  # Update session rank
-    db.session.commit()
+    invalidate_cached_user(user.id)
+
+# Read-only copy of a user, safe to share between requests and threads
+UserSnapshot = namedtuple("UserSnapshot", ["id", "name", "email", "points", "rank"])
+
+def get_current_user():
+    """Returns a snapshot of the logged-in user. It is looked up at most once
+    per request, and reused across requests for USER_CACHE_TTL seconds.
+    Handlers that change the user should load the User row instead."""
+    if "current_user" in g:
+        return g.current_user
+
+    user_id = session["user_id"]
+    ttl = current_app.config["USER_CACHE_TTL"]
+    snapshot = None
+    state = site_state()
+    if ttl:
+        with state.user_cache_lock:
+            entry = state.user_cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            snapshot = entry[1]
+
+    if snapshot is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        points = user.points or 0
+        snapshot = UserSnapshot(user.id, user.name, user.email, points, rank_for_points(points))
+        if ttl:
+            with state.user_cache_lock:
+                state.user_cache[user_id] = (time.monotonic() + ttl, snapshot)
+
+    g.current_user = snapshot
+    return snapshot
+
+def invalidate_cached_user(user_id):
+    if has_app_context():
+        state = site_state()
+        with state.user_cache_lock:
+            state.user_cache.pop(user_id, None)
+        g.pop("current_user", None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    # Per-request SQL statement counter; g lives as long as the request's app context
+    if has_app_context():
+        g.query_count = g.get("query_count", 0) + 1
+        context.query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def time_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "query_started", None)
+    if started is not None and has_app_context():
+        elapsed = time.perf_counter() - started
+        g.sql_seconds = g.get("sql_seconds", 0.0) + elapsed
+        if current_app.config["SLOW_REQUEST_MS"]:
+            g.setdefault("sql_statements", []).append((elapsed, statement))
+
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+def record_template_time(sender, template, context, **extra):
+    started = g.pop("template_started", None)
+    if started is not None:
+        TEMPLATE_SECONDS.observe(time.perf_counter() - started, template.name)
+
+@site.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@site.after_app_request
+def add_query_count_header(response):
+    if current_app.config["QUERY_COUNT_HEADER"]:
+        response.headers["X-Query-Count"] = str(g.get("query_count", 0))
+    return response
+
+@site.teardown_app_request
+def record_request_metrics(exc):
+    # Runs after a streamed body has been sent, so streaming pages are timed in full
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    route = request.endpoint or "unmatched"
+    REQUEST_SECONDS.observe(elapsed, route)
+    REQUEST_SQL_STATEMENTS.observe(g.get("query_count", 0), route)
+    REQUEST_SQL_SECONDS.observe(g.get("sql_seconds", 0.0), route)
+
+    slow_ms = current_app.config["SLOW_REQUEST_MS"]
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        statements = "\n".join(f"  {seconds * 1000:8.2f} ms  {statement}" for seconds, statement in g.get("sql_statements", []))
+        current_app.logger.warning("Slow request %s %s: %.1f ms, %d SQL statement(s) in %.1f ms\n%s",
+                           request.method, request.full_path.rstrip("?"), elapsed * 1000, g.get("query_count", 0),
+                           g.get("sql_seconds", 0.0) * 1000, statements)
 
-@app.route("/dashboard")
+# Built assets are named after a hash of their content, e.g. css/site.0123456789ab.css
+HASHED_ASSET = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+
+def asset_url(name):
+    """URL of a built asset such as "site.css", or its CDN fallback before the first build."""
+    manifest = site_state().asset_manifest
+    if name in manifest:
+        return url_for("site.asset", filename=manifest[name])
+    return ASSET_FALLBACKS[name]
+
+@site.app_context_processor
+def inject_asset_url():
+    return {"asset_url": asset_url}
+
+@site.route("/assets/<path:filename>")
+def asset(filename):
+    """Serves a content-hashed asset, using the brotli or gzip copy made by the
+    build when the browser accepts it. A changed file gets a new name, so the
+    response may be cached for a year without revalidation."""
+    if not HASHED_ASSET.search(filename):
+        return Response("Not Found", status=404, mimetype="text/plain")
+
+    folder = current_app.static_folder
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        path = safe_join(folder, filename + suffix)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            response = send_from_directory(folder, filename + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                           max_age=31536000)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(folder, filename, max_age=31536000)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@site.route("/metrics")
+def metrics():
+    if not current_app.config["METRICS_ENABLED"]:
+        return Response("Not Found", status=404, mimetype="text/plain")
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+def get_data_version(user_id):
+    """Returns the user's data version. A counter row backfilled here is
+    committed at once, so that later changes bump its version."""
+    stats = db.session.get(DeadlineStats, user_id)
+    if stats is None:
+        stats = get_deadline_stats(user_id)
+        db.session.commit()
+    return stats.version
+
+def cached_page(view=None, *, renders_flashes=False):
+    """Serves a logged-in user's page from the page cache while their data
+    version is unchanged, and answers matching If-None-Match with 304.
+    Responses that change the session are not cached, nor are pages that
+    render flashed messages while some are waiting (renders_flashes=True)."""
+    if view is None:
+        return lambda view: cached_page(view, renders_flashes=renders_flashes)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if "user_id" not in session or (renders_flashes and "_flashes" in session) or wants_stream():
+            return view(*args, **kwargs)
+
+        user_id = session["user_id"]
+        version = get_data_version(user_id)
+
+        # The date is part of the key because reminders expire at midnight
+        path = request.full_path
+        etag = f"u{user_id}-v{version}-{datetime.today():%Y%m%d}-{zlib.crc32(path.encode()):08x}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            key = (user_id, path, version, etag)
+            entry = site_state().page_cache.get(key) if current_app.config["PAGE_CACHE_MAX_BYTES"] else None
+            if entry is not None:
+                response = Response(entry[0], mimetype=entry[1])
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or session.modified:
+                    return response
+                if current_app.config["PAGE_CACHE_MAX_BYTES"]:
+                    site_state().page_cache.put(key, response.get_data(), response.mimetype)
+
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"  # Browsers must revalidate with the ETag
+        return response
+    return wrapper
+
+@site.route("/dashboard")
+@cached_page(renders_flashes=True)
 def dashboard():
     if "user_id" not in session:
         flash("Please log in to access the dashboard.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for(".login"))
 
     user_id = session["user_id"]
-    user = User.query.get(user_id)  # Fetch user details
-    update_user_rank(user)  # Ensure rank is updated before rendering
-    user_deadlines = Deadline.query.filter_by(user_id=user_id).all()
-
-    # Calculate progress
-    user_deadlines = Deadline.query.filter_by(user_id=user_id).all()
-    total_deadlines = len(user_deadlines)
-    completed_deadlines = sum(1 for deadline in user_deadlines if deadline.completed)
-    progress = (completed_deadlines / total_deadlines) * 100 if total_deadlines > 0 else 0
+    user = get_current_user()  # Cached snapshot, rank derived from points without a write
+    progress = calculate_progress(user_id)  # Read from the counters, no row scan
 
-    # Get upcoming notifications
-    upcoming_deadlines = check_deadline_notifications(user_id)  # ✅ Fix: This is the correct variable
+    # Get upcoming notifications (written by the sweeper, only read here)
+    upcoming_deadlines = get_unread_notifications(user_id)
 
-    if upcoming_deadlines:
-        flash("⚠️ Reminder: You have deadlines due tomorrow! Check your calendar. 📅", "warning")
+    # Flash once per new reminder; the newest one seen is kept in the session, not the database
+    newest_id = max((n.id for n in upcoming_deadlines), default=0)
+    if newest_id > session.get("last_notification_id", 0):
+        session["last_notification_id"] = newest_id
+        flash("⚠️ Reminder: You have deadlines due soon! Check your calendar. 📅", "warning")
 
     return render_template("dashboard.html", name=session["user_name"], progress=progress, notifications=upcoming_deadlines, rank=user.rank)
 
+@site.route("/notifications/dismiss", methods=["POST"])
+def dismiss_notifications():
+    if "user_id" not in session:
+        flash("Please log in to update reminders.", "warning")
+        return redirect(url_for(".login"))
+
+    Notification.query.filter_by(user_id=session["user_id"], read=False).update({"read": True})
+    get_deadline_stats(session["user_id"]).version = DeadlineStats.version + 1
+    db.session.commit()
+    return redirect(url_for(".dashboard"))
+
 # Route for logout
-@app.route("/logout")
+@site.route("/logout")
 def logout():
     session.pop("user_id", None)
     session.pop("user_name", None)
     flash("You have been logged out.", "info")
-    return redirect(url_for("login"))
+    return redirect(url_for(".login"))
 
 # Route to add a deadline
-@app.route("/add_deadline", methods=["GET", "POST"])
+@site.route("/add_deadline", methods=["GET", "POST"])
 def add_deadline():
     if "user_id" not in session:
         flash("Please log in to add deadlines.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for(".login"))
 
     if request.method == "POST":
         title = request.form.get("title")
@@ -192,111 +864,390 @@ def add_deadline():
             due_date = datetime.strptime(due_date, "%Y-%m-%d").date()
         except ValueError:
             flash("Invalid date format. Use YYYY-MM-DD.", "danger")
-            return redirect(url_for("add_deadline"))
+            return redirect(url_for(".add_deadline"))
 
         priority = request.form.get("priority")
+        stats = get_deadline_stats(session["user_id"])
         new_deadline = Deadline(title=title, due_date=due_date, user_id=session["user_id"], priority=priority)
         db.session.add(new_deadline)
+        stats.total = DeadlineStats.total + 1
+        stats.version = DeadlineStats.version + 1
         db.session.commit()
 
         flash("Deadline added successfully!", "success")
-        return redirect(url_for("calendar"))
+        return redirect(url_for(".calendar"))
 
     return render_template("add_deadline.html")
 
-@app.route("/calendar")
+def import_deadlines(user_id, records):
+    """Validates deadline records and inserts them in batches of
+    IMPORT_BATCH_SIZE rows, updating the user's counters once at the end.
+    The caller commits. Returns (imported, skipped)."""
+    stats = get_deadline_stats(user_id)  # Before inserting, so a backfill does not count the new rows
+    batch_size = current_app.config["IMPORT_BATCH_SIZE"]
+    imported = skipped = 0
+    batch = []
+
+    for record in records:
+        title = str(record.get("title") or "").strip()[:100]
+        try:
+            due_date = datetime.strptime(str(record.get("due_date") or "").strip(), "%Y-%m-%d").date()
+        except ValueError:
+            skipped += 1
+            continue
+        if not title:
+            skipped += 1
+            continue
+        priority = str(record.get("priority") or "Medium").strip().capitalize()
+        if priority not in ["High", "Medium", "Low"]:
+            priority = "Medium"
+
+        batch.append({"user_id": user_id, "title": title, "due_date": due_date, "priority": priority,
+                      "completed": False, "notified": False})
+        if len(batch) >= batch_size:
+            db.session.execute(db.insert(Deadline.__table__), batch)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        db.session.execute(db.insert(Deadline.__table__), batch)
+        imported += len(batch)
+
+    stats.total = DeadlineStats.total + imported
+    stats.version = DeadlineStats.version + 1
+    return imported, skipped
+
+@site.route("/import_deadlines", methods=["GET", "POST"])
+def import_deadlines_upload():
+    if "user_id" not in session:
+        flash("Please log in to import deadlines.", "warning")
+        return redirect(url_for(".login"))
+
+    if request.method == "POST":
+        upload = request.files.get("file")
+        read = reader_for(upload.filename) if upload else None
+        if read is None:
+            flash("Please choose a .csv, .ics, .json or .jsonl file.", "danger")
+            return redirect(url_for(".import_deadlines_upload"))
+
+        try:
+            imported, skipped = import_deadlines(session["user_id"], read(upload.stream))
+            db.session.commit()  # One transaction for the whole file
+        except (ValueError, UnicodeDecodeError) as e:  # json.JSONDecodeError is a ValueError
+            db.session.rollback()
+            flash(f"Could not read the file: {e}", "danger")
+            return redirect(url_for(".import_deadlines_upload"))
+
+        message = f"Imported {imported} deadline(s)."
+        if skipped:
+            message += f" Skipped {skipped} row(s) without a title or a YYYY-MM-DD due date."
+        flash(message, "success" if imported else "warning")
+        return redirect(url_for(".calendar"))
+
+    return render_template("import_deadlines.html")
+
+def get_page_size():
+    """Returns the requested page size, clamped to the configured maximum."""
+    page_size = request.args.get("page_size", current_app.config["PAGE_SIZE"], type=int)
+    return max(1, min(page_size, current_app.config["MAX_PAGE_SIZE"]))
+
+def parse_cursor(value, parse_key):
+    """Splits a "<key>_<id>" keyset cursor into (key, id), or returns None
+    if the cursor is missing or malformed."""
+    if not value:
+        return None
+    key, _, row_id = value.rpartition("_")
+    try:
+        return parse_key(key), int(row_id)
+    except ValueError:
+        return None
+
+def fetch_page(query, page_size):
+    """Fetches one page plus one extra row to learn whether another page exists."""
+    rows = query.limit(page_size + 1).all()
+    return rows[:page_size], len(rows) > page_size
+
+def wants_stream():
+    return current_app.config["STREAM_TABLES"] or request.args.get("stream") == "1"
+
+def render_table(template_name, **context):
+    """Renders a table page, streaming it in chunks when streaming is enabled
+    so rows are sent as they are read instead of after the whole page is built."""
+    if wants_stream():
+        return Response(stream_template(template_name, **context))
+    return render_template(template_name, **context)
+
+@site.route("/calendar")
+@cached_page
 def calendar():
     if "user_id" not in session:
         flash("Please log in to view your deadlines.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for(".login"))
 
     user_id = session["user_id"]
-    user = User.query.get(user_id)  # Fetch user details
+    user = get_current_user()  # Fetch user details
     selected_priority = request.args.get("priority")  # Get priority from query parameters
 
+    page_size = get_page_size()
+
     # Filter deadlines based on priority
     if selected_priority and selected_priority in ["High", "Medium", "Low"]:
-        deadlines = Deadline.query.filter_by(user_id=user_id, priority=selected_priority).order_by(Deadline.due_date).all()
+        query = Deadline.query.filter_by(user_id=user_id, priority=selected_priority)
+    else:
+        selected_priority = None
+        query = Deadline.query.filter_by(user_id=user_id)
+    query = query.order_by(Deadline.due_date, Deadline.id)
+
+    if wants_stream():
+        deadlines, next_cursor = query.yield_per(100), None
     else:
-        deadlines = Deadline.query.filter_by(user_id=user_id).order_by(Deadline.due_date).all()
+        # Seek past the last (due_date, id) of the previous page instead of using OFFSET
+        cursor = parse_cursor(request.args.get("after"), lambda key: datetime.strptime(key, "%Y-%m-%d").date())
+        if cursor:
+            query = query.filter(db.tuple_(Deadline.due_date, Deadline.id) > cursor)
+        deadlines, has_more = fetch_page(query, page_size)
+        next_cursor = f"{deadlines[-1].due_date:%Y-%m-%d}_{deadlines[-1].id}" if has_more else None
 
     # Calculate progress
-    total_deadlines = len(deadlines)
-    completed_deadlines = sum(1 for deadline in deadlines if deadline.completed)
-    progress = (completed_deadlines / total_deadlines) * 100 if total_deadlines > 0 else 0
+    progress = calculate_progress(user_id, selected_priority)
 
-    return render_template("calendar.html", deadlines=deadlines, progress=progress, selected_priority=selected_priority, rank=user.rank)
+    return render_table("calendar.html", deadlines=deadlines, progress=progress, selected_priority=selected_priority,
+                        rank=user.rank, next_cursor=next_cursor, page_size=page_size,
+                        is_first_page=not request.args.get("after"))
+
+def parse_date_range(args):
+    """Reads ?month=YYYY-MM, or ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive),
+    into a (start, end) pair of dates. Raises ValueError for bad input."""
+    if args.get("month"):
+        try:
+            start = datetime.strptime(args["month"], "%Y-%m").date()
+        except ValueError:
+            raise ValueError("Invalid month format. Use YYYY-MM.")
+        end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        return start, end
+
+    try:
+        start = datetime.strptime(args.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(args.get("end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD for start and end, or YYYY-MM for month.")
+    if end < start or (end - start).days > current_app.config["CALENDAR_API_MAX_DAYS"]:
+        raise ValueError(f"The range must run forward and span at most {current_app.config['CALENDAR_API_MAX_DAYS']} days.")
+    return start, end
+
+@site.route("/api/calendar")
+@cached_page
+def calendar_api():
+    """Deadlines in a date window plus per-day counts by priority and completion,
+    bucketed by the database with GROUP BY due_date. Rows are sent as arrays in
+    the order given by "fields" to keep the payload small."""
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in."}), 401
+
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-def calculate_progress():
     user_id = session["user_id"]
-    user_deadlines = Deadline.query.filter_by(user_id=user_id).all()
+    in_window = (Deadline.user_id == user_id, Deadline.due_date >= start, Deadline.due_date <= end)
+
+    deadlines = db.session.query(
+        Deadline.id, Deadline.title, Deadline.due_date, Deadline.priority, Deadline.completed
+    ).filter(*in_window).order_by(Deadline.due_date, Deadline.id).all()
 
-    total_deadlines = len(user_deadlines)
-    completed_deadlines = sum(1 for deadline in user_deadlines if deadline.completed)
+    buckets = db.session.query(
+        Deadline.due_date,
+        Deadline.priority,
+        db.func.count(Deadline.id),
+        db.func.coalesce(db.func.sum(db.case((Deadline.completed, 1), else_=0)), 0),
+    ).filter(*in_window).group_by(Deadline.due_date, Deadline.priority).all()
+
+    days = {}
+    for due_date, priority, total, completed in buckets:
+        day = days.setdefault(due_date.isoformat(), {"total": 0, "completed": 0, "High": 0, "Medium": 0, "Low": 0})
+        day["total"] += total
+        day["completed"] += completed
+        if priority in day:
+            day[priority] += total
+
+    return jsonify({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "fields": ["id", "title", "due_date", "priority", "completed"],
+        "deadlines": [[d.id, d.title, d.due_date.isoformat(), d.priority, bool(d.completed)] for d in deadlines],
+        "days": days,
+    })
+
+def calculate_progress(user_id=None, priority=None):
+    if user_id is None:
+        user_id = session["user_id"]
+
+    if priority:
+        # Filtered views fall back to one aggregate over the matching rows
+        total_deadlines, completed_deadlines = db.session.query(
+            db.func.count(Deadline.id),
+            db.func.coalesce(db.func.sum(db.case((Deadline.completed, 1), else_=0)), 0),
+        ).filter(Deadline.user_id == user_id, Deadline.priority == priority).one()
+    else:
+        stats = get_deadline_stats(user_id)
+        total_deadlines, completed_deadlines = stats.total, stats.completed
 
     return (completed_deadlines / total_deadlines) * 100 if total_deadlines > 0 else 0
 
-@app.route("/mark_completed/<int:deadline_id>", methods=["POST"])
+@site.route("/mark_completed/<int:deadline_id>", methods=["POST"])
 def mark_completed(deadline_id):
     if "user_id" not in session:
         flash("Please log in to update deadlines.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for(".login"))
 
     user_id = session["user_id"]
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)  # Full row, since points change below
     deadline = Deadline.query.filter_by(id=deadline_id, user_id=user_id).first()
 
     if not deadline:
         flash("Deadline not found!", "danger")
-        return redirect(url_for("calendar"))
-
-    deadline.completed = True
-
-    # Award points based on priority
-    if deadline.priority == "High":
-        user.points += 20
-    elif deadline.priority == "Medium":
-        user.points += 15
-    elif deadline.priority == "Low":
-        user.points += 10
-
-    # Check if all deadlines are completed
-    user_deadlines = Deadline.query.filter_by(user_id=user_id).all()
-    all_completed = all(d.completed for d in user_deadlines) if user_deadlines else False
-
-    if all_completed and user_deadlines:
-        for d in user_deadlines:
-            completed_deadline = History(
-                user_id=d.user_id,
-                title=d.title,
-                due_date=d.due_date,
-                priority=d.priority,
-                completed_on=datetime.today().date()
-            )
-            db.session.add(completed_deadline)
-        Deadline.query.filter_by(user_id=user_id).delete()
+        return redirect(url_for(".calendar"))
+
+    stats = get_deadline_stats(user_id)
+    # Conditional UPDATE, so two requests completing the same deadline count it once
+    newly_completed = db.session.execute(
+        db.update(Deadline).where(Deadline.id == deadline.id, Deadline.completed.is_(False))
+        .values(completed=True).execution_options(synchronize_session=False)
+    ).rowcount
+    awarded = PRIORITY_POINTS.get(deadline.priority, 0) if newly_completed else 0
+    if newly_completed:
+        stats.completed = DeadlineStats.completed + 1
+        stats.version = DeadlineStats.version + 1
+        # Award points based on priority, added in SQL so concurrent completions all count
+        user.points = db.func.coalesce(User.points, 0) + awarded
+
+    title = deadline.title  # Another request may archive the row once this one commits
+
+    # Check if all deadlines are completed; the flush runs the UPDATEs, and the
+    # counters and points are then read back as the database has them
+    db.session.flush()
+    all_completed = stats.total > 0 and stats.completed >= stats.total
+
+    if all_completed:
+        archive_completed_deadlines(user_id)
         flash("All deadlines completed! Moved to history.", "success")
 
     update_user_rank(user)
-    session["rank"] = user.rank  # Update session rank
+    new_points = user.points or 0
     db.session.commit()
+    ranking = site_state().points_ranking
+    if awarded and ranking.loaded_at is not None:
+        ranking.move(new_points - awarded, new_points)
 
-    flash(f"'{deadline.title}' marked as completed!", "success")
-    return redirect(url_for("calendar"))
+    flash(f"'{title}' marked as completed!", "success")
+    return redirect(url_for(".calendar"))
 
-@app.route("/history")
+@site.route("/history")
+@cached_page
 def history():
     if "user_id" not in session:
         flash("Please log in to view history.", "warning")
-        return redirect(url_for("login"))
+        return redirect(url_for(".login"))
 
     user_id = session["user_id"]
-    completed_deadlines = History.query.filter_by(user_id=user_id).order_by(History.completed_on.desc()).all()
+    page_size = get_page_size()
+    query = History.query.filter_by(user_id=user_id).order_by(History.completed_on.desc(), History.id.desc())
 
-    return render_template("history.html", completed_deadlines=completed_deadlines)
+    if wants_stream():
+        completed_deadlines, next_cursor = query.yield_per(100), None
+    else:
+        # Newest first, so the next page holds rows before the last (completed_on, id)
+        cursor = parse_cursor(request.args.get("before"), datetime.fromisoformat)
+        if cursor:
+            query = query.filter(db.tuple_(History.completed_on, History.id) < cursor)
+        completed_deadlines, has_more = fetch_page(query, page_size)
+        next_cursor = f"{completed_deadlines[-1].completed_on.isoformat()}_{completed_deadlines[-1].id}" if has_more else None
+
+    return render_table("history.html", completed_deadlines=completed_deadlines, next_cursor=next_cursor,
+                        page_size=page_size, is_first_page=not request.args.get("before"))
+
+@site.route("/history/archived")
+@cached_page
+def archived_history():
+    if "user_id" not in session:
+        flash("Please log in to view history.", "warning")
+        return redirect(url_for(".login"))
+
+    # Read straight from the user's gzip file; use ?stream=1 for very long archives
+    return render_table("history.html", completed_deadlines=read_archived_history(session["user_id"]),
+                        next_cursor=None, page_size=get_page_size(), is_first_page=True, archived=True)
+
+@site.route("/api/history/summary")
+@cached_page
+def history_summary_api():
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in."}), 401
+
+    rows = (
+        db.session.query(HistoryRollup.month, HistoryRollup.priority, HistoryRollup.completed, HistoryRollup.points)
+        .filter(HistoryRollup.user_id == session["user_id"]).order_by(HistoryRollup.month.desc()).all()
+    )
+    months = {}
+    for month, priority, completed, points in rows:
+        entry = months.setdefault(month, {"month": month, "completed": 0, "points": 0, "by_priority": {}})
+        entry["completed"] += completed
+        entry["points"] += points
+        entry["by_priority"][priority] = completed
+    return jsonify({
+        "months": list(months.values()),
+        "completed": sum(entry["completed"] for entry in months.values()),
+        "points": sum(entry["points"] for entry in months.values()),
+    })
+
+def get_points_ranking():
+    """Returns the leaderboard ranking, reloading it with one grouped query over
+    the points index when it is older than LEADERBOARD_REFRESH seconds. Between
+    reloads it is kept current by signup and mark_completed in this process."""
+    ranking = site_state().points_ranking
+    loaded_at = ranking.loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > current_app.config["LEADERBOARD_REFRESH"]:
+        ranking.load(db.session.query(User.points, db.func.count(User.id)).group_by(User.points).all())
+    return ranking
+
+def get_leaderboard(limit):
+    """Returns the top `limit` users and the current user's own standing."""
+    ranking = get_points_ranking()
+    top_users = db.session.query(User.id, User.name, User.points).order_by(User.points.desc(), User.id).limit(limit).all()
+    user = get_current_user()
+    return {
+        "top": [
+            {"position": ranking.position(points or 0), "name": name, "points": points or 0,
+             "rank": rank_for_points(points or 0), "is_you": user_id == user.id}
+            for user_id, name, points in top_users
+        ],
+        "you": {"position": ranking.position(user.points), "name": user.name, "points": user.points, "rank": user.rank},
+        "users": ranking.total,
+    }
+
+def get_leaderboard_limit():
+    return max(1, min(request.args.get("n", 10, type=int), 100))
+
+@site.route("/leaderboard")
+def leaderboard():
+    if "user_id" not in session:
+        flash("Please log in to view the leaderboard.", "warning")
+        return redirect(url_for(".login"))
+
+    return render_template("leaderboard.html", **get_leaderboard(get_leaderboard_limit()))
+
+@site.route("/api/leaderboard")
+def leaderboard_api():
+    if "user_id" not in session:
+        return jsonify({"error": "Please log in."}), 401
+
+    return jsonify(get_leaderboard(get_leaderboard_limit()))
+
+app = create_app()  # For `flask --app app`, WSGI servers (gunicorn app:app) and the scripts
 
 # Run app
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()  # Create database tables if they don't exist
+    # The debug reloader runs this file twice; only sweep in the process that serves requests
+    if app.config["NOTIFICATION_SWEEP_INTERVAL"] and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_notification_sweeper(app, app.config["NOTIFICATION_SWEEP_INTERVAL"])
     app.run(debug=True, port=5001)  # Keep only one app.run()
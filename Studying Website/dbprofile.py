@@ -0,0 +1,53 @@
+"""
+SQLite performance profiles for the Studying Website.
+
+"default" leaves SQLite as it is (rollback journal, writers block readers).
+"concurrent" switches to WAL so readers and one writer run together, waits
+for locks instead of failing with "database is locked", and gives each
+connection a larger page cache and memory-mapped reads. WAL needs a local
+filesystem, so keep "default" on network-mounted storage.
+"""
+from sqlalchemy import event
+
+PROFILES = {
+    "default": {
+        "pragmas": {},
+        "engine_options": {},
+    },
+    "concurrent": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",  # Safe with WAL; only the last commits can be lost on power failure
+            "busy_timeout": 5000,  # Milliseconds to wait for the write lock
+            "cache_size": -32000,  # Negative means KiB, so about 32 MB per connection
+            "mmap_size": 268435456,  # 256 MB of memory-mapped reads
+            "temp_store": "MEMORY",
+        },
+        # SQLite allows one writer at a time, so a small pool is enough; extra
+        # connections would only queue on the write lock.
+        "engine_options": {
+            "pool_size": 8,
+            "max_overflow": 8,
+            "pool_timeout": 30,
+        },
+    },
+}
+
+
+def engine_options(profile):
+    """Returns the SQLALCHEMY_ENGINE_OPTIONS for a profile."""
+    return dict(PROFILES[profile]["engine_options"])
+
+
+def apply_sqlite_pragmas(engine, profile):
+    """Runs the profile's PRAGMA statements on every new connection of the engine."""
+    pragmas = PROFILES[profile]["pragmas"]
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -0,0 +1,100 @@
+"""
+Readers for bulk deadline uploads (CSV, iCalendar and JSON).
+
+Each reader takes a binary file object and yields one dictionary per
+deadline with "title", "due_date" (a "YYYY-MM-DD" string) and "priority"
+keys. Values are passed through as found; app.py validates them with the
+same rules as the single add-deadline form. CSV, iCalendar and JSON Lines
+are read line by line, so large files are never held in memory at once.
+"""
+import csv
+import io
+import json
+
+# iCalendar PRIORITY is 1 (highest) to 9 (lowest), 0 meaning undefined
+ICS_PRIORITIES = {1: "High", 2: "High", 3: "High", 4: "High", 5: "Medium", 6: "Low", 7: "Low", 8: "Low", 9: "Low"}
+
+
+def read_csv(stream):
+    """Reads a CSV file with a header row naming title, due_date and priority columns."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    for row in csv.DictReader(text):
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        yield {"title": row.get("title"), "due_date": row.get("due_date"), "priority": row.get("priority")}
+
+
+def read_json(stream):
+    """Reads a JSON list of objects with title, due_date and priority keys."""
+    records = json.load(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON list of deadlines.")
+    for record in records:
+        if isinstance(record, dict):
+            yield record
+
+
+def read_json_lines(stream):
+    """Reads one JSON object per line (JSON Lines / NDJSON)."""
+    for line in io.TextIOWrapper(stream, encoding="utf-8-sig"):
+        if line.strip():
+            record = json.loads(line)
+            if isinstance(record, dict):
+                yield record
+
+
+def _unfold(lines):
+    """Joins iCalendar continuation lines, which start with a space or tab."""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _ics_date(value):
+    """Turns an iCalendar DATE or DATE-TIME (20250301 / 20250301T090000Z) into "2025-03-01"."""
+    value = value.strip()
+    if len(value) < 8 or not value[:8].isdigit():
+        return value  # Left for the caller's date validation to reject
+    return f"{value[:4]}-{value[4:6]}-{value[6:8]}"
+
+
+def read_ics(stream):
+    """Reads the VEVENT and VTODO entries of an iCalendar file. DUE is used
+    for to-dos, and DTSTART otherwise."""
+    event = None
+    for line in _unfold(io.TextIOWrapper(stream, encoding="utf-8-sig")):
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() in ("VEVENT", "VTODO"):
+            event = {}
+        elif name == "END" and value.upper() in ("VEVENT", "VTODO") and event is not None:
+            yield {
+                "title": event.get("SUMMARY"),
+                "due_date": _ics_date(event.get("DUE") or event.get("DTSTART") or ""),
+                "priority": ICS_PRIORITIES.get(int(event["PRIORITY"])) if event.get("PRIORITY", "").isdigit() else None,
+            }
+            event = None
+        elif event is not None:
+            event[name] = value.replace("\\,", ",").replace("\\;", ";").replace("\\n", " ")
+
+
+READERS = {
+    ".csv": read_csv,
+    ".json": read_json,
+    ".jsonl": read_json_lines,
+    ".ndjson": read_json_lines,
+    ".ics": read_ics,
+}
+
+
+def reader_for(filename):
+    """Returns the reader for a file name's extension, or None if unsupported."""
+    _, dot, extension = (filename or "").rpartition(".")
+    return READERS.get("." + extension.lower()) if dot else None
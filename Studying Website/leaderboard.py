@@ -0,0 +1,89 @@
+"""
+Order-statistic structure behind the leaderboard.
+
+PointsRanking counts how many users have each points total in a Fenwick
+(binary indexed) tree. A user's position is one plus the number of users
+with more points, which the tree answers in O(log P) for a top score of P,
+however many users there are. Awarding points moves one user between two
+buckets, which is also O(log P).
+"""
+import threading
+import time
+
+
+class PointsRanking:
+    """Counts of users per points total, supporting rank lookups and updates."""
+
+    def __init__(self, size=1024):
+        self.total = 0
+        self.loaded_at = None  # time.monotonic() of the last full load
+        self._counts = [0] * size  # users with exactly i points
+        self._tree = [0] * (size + 1)  # 1-based Fenwick tree over _counts
+        self._lock = threading.Lock()
+
+    def load(self, rows):
+        """Replaces the contents with (points, user_count) rows."""
+        rows = [(max(points or 0, 0), count) for points, count in rows]
+        size = len(self._counts)
+        highest = max((points for points, _ in rows), default=0)
+        while size <= highest:
+            size *= 2
+        counts = [0] * size
+        for points, count in rows:
+            counts[points] += count
+        with self._lock:
+            self._counts = counts
+            self._rebuild()
+            self.total = sum(counts)
+            self.loaded_at = time.monotonic()
+
+    def add(self, points):
+        """Records a new user."""
+        with self._lock:
+            self._update(points, 1)
+            self.total += 1
+
+    def move(self, old_points, new_points):
+        """Records a user's points changing from old_points to new_points."""
+        if old_points == new_points:
+            return
+        with self._lock:
+            self._update(old_points, -1)
+            self._update(new_points, 1)
+
+    def position(self, points):
+        """Returns the 1-based leaderboard position for a points total.
+        Users with equal points share a position."""
+        with self._lock:
+            return 1 + self.total - self._count_at_most(points)
+
+    def _update(self, points, delta):
+        points = max(points or 0, 0)
+        if points >= len(self._counts):
+            size = len(self._counts)
+            while size <= points:
+                size *= 2
+            self._counts.extend([0] * (size - len(self._counts)))
+            self._rebuild()
+        self._counts[points] += delta
+        i = points + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_at_most(self, points):
+        i = min(max(points or 0, 0) + 1, len(self._tree) - 1)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def _rebuild(self):
+        # Linear-time Fenwick construction: push each node's sum to its parent
+        tree = [0] + self._counts
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
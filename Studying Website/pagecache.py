@@ -0,0 +1,55 @@
+"""
+In-memory cache of rendered pages for the Studying Website.
+
+Entries are keyed by whatever the caller chooses (user, URL and data version
+in app.py), evicted least recently used first, and bounded by the total size
+of the cached bodies rather than by entry count.
+"""
+import threading
+from collections import OrderedDict
+
+
+class PageCache:
+    """A thread-safe LRU cache of response bodies with a byte budget."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (body, mimetype)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (body, mimetype) for the key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype):
+        """Stores a body, evicting the least recently used entries to stay in budget.
+        Bodies larger than the whole budget are not stored."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[key] = (body, mimetype)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
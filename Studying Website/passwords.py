@@ -0,0 +1,80 @@
+"""
+Password hashing for the Studying Website.
+
+bcrypt is deliberately slow, so during login spikes it can take most of a
+worker's time. PasswordHasher can hand the work to a small pool of worker
+processes, which are not limited by the GIL, and keeps the work factor
+configurable so stored hashes can be upgraded on the next login.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+
+def hash_password(password, rounds):
+    """Returns a bcrypt hash of the password using 2**rounds iterations."""
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def check_password(hashed, password):
+    """Returns True if the password matches the stored hash."""
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:  # Malformed hash or a password bcrypt refuses (over 72 bytes)
+        return False
+
+
+def hash_rounds(hashed):
+    """Returns the work factor stored in a hash such as "$2b$12$...", or None."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Hashes and checks passwords, inline when workers is 0 or on a bounded
+    process pool otherwise. The pool is started on first use, so each web
+    worker process gets its own after forking. If given, observe(operation,
+    seconds) is called after every hash or check, including time spent
+    waiting for a pool worker."""
+
+    def __init__(self, rounds=12, workers=0, observe=None):
+        self.rounds = rounds
+        self.workers = workers
+        self.observe = observe
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _run(self, operation, func, *args):
+        start = time.perf_counter()
+        try:
+            if not self.workers:
+                return func(*args)
+            if self._pool is None:
+                with self._pool_lock:
+                    if self._pool is None:
+                        # spawn: forking a process that is already running request threads is unsafe
+                        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool.submit(func, *args).result()
+        finally:
+            if self.observe is not None:
+                self.observe(operation, time.perf_counter() - start)
+
+    def hash(self, password):
+        return self._run("hash", hash_password, password, self.rounds)
+
+    def check(self, hashed, password):
+        return self._run("check", check_password, hashed, password)
+
+    def needs_rehash(self, hashed):
+        """True when the hash was made with a different work factor than configured."""
+        return hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,52 @@
+"""
+Measures password checks ("logins") per second for several bcrypt work
+factors and worker-process counts, using the same PasswordHasher as app.py.
+Requests are sent from a pool of threads, like a threaded web server would.
+
+Usage (from the Studying Website folder):
+    python scripts/bench_bcrypt.py --rounds 10 12 --workers 0 2 4 --logins 64
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def logins_per_second(rounds, workers, logins, threads):
+    hasher = PasswordHasher(rounds, workers)
+    try:
+        stored = hasher.hash(PASSWORD)  # Also starts the pool outside the timed section
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(lambda _: hasher.check(stored, PASSWORD), range(logins)))
+        elapsed = time.perf_counter() - start
+    finally:
+        hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=32, help="password checks per measurement")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent request threads")
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'workers':>7} {'logins/s':>10}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            rate = logins_per_second(rounds, workers, args.logins, args.threads)
+            print(f"{rounds:>6} {workers:>7} {rate:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
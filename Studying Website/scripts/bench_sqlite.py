@@ -0,0 +1,108 @@
+"""
+Threaded SQLite load test comparing the database profiles in dbprofile.py.
+
+Each profile gets a fresh database with the app's schema. Worker threads then
+run a mix of calendar-style reads and small write transactions for a fixed
+time. The script reports operations per second and how many operations failed
+with "database is locked".
+
+Usage (from the Studying Website folder):
+    python scripts/bench_sqlite.py --threads 16 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbprofile import PROFILES, apply_sqlite_pragmas, engine_options  # noqa: E402
+
+USERS = 200
+DEADLINES_PER_USER = 50
+
+
+def seed(engine, metadata):
+    metadata.create_all(engine)
+    today = date.today()
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO user (id, name, email, password, points, rank) "
+                                "VALUES (:id, :name, :email, 'x', 0, 'Unranked')"),
+                           [{"id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in range(1, USERS + 1)])
+        connection.execute(text("INSERT INTO deadline (user_id, title, due_date, completed, priority, notified) "
+                                "VALUES (:user_id, :title, :due_date, 0, 'Medium', 0)"),
+                           [{"user_id": u, "title": f"task {n}", "due_date": (today + timedelta(days=n)).isoformat()}
+                            for u in range(1, USERS + 1) for n in range(DEADLINES_PER_USER)])
+
+
+def worker(engine, stop, write_ratio, counts, lock):
+    done = locked = 0
+    rng = random.Random()
+    while not stop.is_set():
+        user_id = rng.randint(1, USERS)
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as connection:
+                    connection.execute(text("UPDATE user SET points = points + 10 WHERE id = :id"), {"id": user_id})
+                    connection.execute(text("UPDATE deadline SET notified = NOT notified "
+                                            "WHERE id = (SELECT id FROM deadline WHERE user_id = :id LIMIT 1)"),
+                                       {"id": user_id})
+            else:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT * FROM deadline WHERE user_id = :id ORDER BY due_date"),
+                                       {"id": user_id}).fetchall()
+            done += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    with lock:
+        counts["ops"] += done
+        counts["locked"] += locked
+
+
+def run_profile(profile, metadata, threads, seconds, write_ratio):
+    with tempfile.TemporaryDirectory() as folder:
+        engine = create_engine(f"sqlite:///{os.path.join(folder, 'bench.db')}", **engine_options(profile))
+        apply_sqlite_pragmas(engine, profile)
+        seed(engine, metadata)
+
+        counts, lock, stop = {"ops": 0, "locked": 0}, threading.Lock(), threading.Event()
+        pool = [threading.Thread(target=worker, args=(engine, stop, write_ratio, counts, lock)) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in pool:
+            thread.join()
+        engine.dispose()
+    return counts["ops"] / seconds, counts["locked"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    # Importing the app only for its table definitions; point it at a throwaway database
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from app import db
+
+    print(f"{'profile':>10} {'ops/s':>10} {'locked':>7}")
+    for profile in args.profiles:
+        rate, locked = run_profile(profile, db.metadata, args.threads, args.seconds, args.write_ratio)
+        print(f"{profile:>10} {rate:>10.1f} {locked:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Builds the site's stylesheet from Tailwind 2.2.19, keeping only the rules for
+classes that the templates use.
+
+The templates are scanned for every word that could be a class name, and
+rules for any other class are dropped. Rules without a class (the base
+styles) are always kept. The result is minified and written to
+static/css/site.<hash>.css, with .gz and .br copies next to it (the .br copy
+needs the optional brotli package). static/manifest.json maps "site.css" to
+the current file for app.py's asset_url(). Run it again after changing the
+templates, then restart the site.
+
+Usage (from the Studying Website folder):
+    python scripts/build_css.py
+    python scripts/build_css.py --source tailwind.min.css  # use a downloaded copy
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SITE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SITE_DIR)
+
+from app import TAILWIND_CDN_URL, TEMPLATE_FOLDER  # noqa: E402
+
+STATIC_DIR = os.path.join(SITE_DIR, "static")
+OUTPUT_DIR = os.path.join(STATIC_DIR, "css")
+MANIFEST = os.path.join(STATIC_DIR, "manifest.json")
+
+# Classes the scan cannot see because a template builds them from pieces,
+# e.g. calendar.html's text-{{ 'orange-600' if ... }}
+SAFELIST = {"text-orange-600", "text-blue-600", "text-purple-600"}
+
+CANDIDATE = re.compile(r"[A-Za-z0-9_:/.\-]+")
+CLASS_SELECTOR = re.compile(r"\.((?:\\.|[A-Za-z0-9_\-])+)")
+
+
+def template_classes(folder):
+    """Returns every token in the templates that could be a class name."""
+    found = set(SAFELIST)
+    for path in glob.glob(os.path.join(folder, "**", "*.html"), recursive=True):
+        with open(path, encoding="utf-8") as file:
+            found.update(CANDIDATE.findall(file.read()))
+    return found
+
+
+def parse_blocks(css):
+    """Splits a stylesheet into (prelude, body) pairs. The body is the text
+    between the braces, or None for statements such as @charset."""
+    blocks, depth, start, prelude = [], 0, 0, None
+    for i, char in enumerate(css):
+        if char == "{":
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[start:i]))
+                start = i + 1
+        elif char == ";" and depth == 0:
+            blocks.append((css[start:i].strip(), None))
+            start = i + 1
+    return blocks
+
+
+def purge(css, used):
+    """Returns the rules of `css` whose selectors only need classes in `used`."""
+    out = []
+    for prelude, body in parse_blocks(css):
+        if body is None:
+            out.append(prelude + ";")
+        elif prelude.startswith(("@media", "@supports")):
+            inner = purge(body, used)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            out.append(f"{prelude}{{{body}}}")  # @keyframes, @font-face: filtered below
+        else:
+            selectors = [
+                selector for selector in prelude.split(",")
+                if all(re.sub(r"\\(.)", r"\1", name) in used for name in CLASS_SELECTOR.findall(selector))
+            ]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(out)
+
+
+def drop_unused_keyframes(css):
+    """Removes @keyframes blocks that no kept rule animates."""
+    def keep(match):
+        name = match.group(1)
+        return match.group(0) if re.search(rf"animation(?:-name)?:[^;}}]*\b{re.escape(name)}\b", css) else ""
+    return re.sub(r"@keyframes\s+([\w-]+)\{(?:[^{}]*\{[^{}]*\})*[^{}]*\}", keep, css)
+
+
+def minify(css):
+    """Strips comments and spaces next to braces, semicolons and commas. Spaces
+    elsewhere can matter (descendant selectors, calc()), so they are left."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def read_source(source):
+    if re.match(r"https?://", source):
+        with urllib.request.urlopen(source, timeout=30) as response:
+            return response.read().decode("utf-8")
+    with open(source, encoding="utf-8") as file:
+        return file.read()
+
+
+def write_bundle(css):
+    """Writes site.<hash>.css and its compressed copies and points the manifest
+    at it. The bundle it replaces is kept for pages that browsers still have
+    cached; older ones are removed. Returns the new file name."""
+    data = css.encode("utf-8")
+    name = f"site.{hashlib.sha256(data).hexdigest()[:12]}.css"
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    keep = {name}
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as file:
+            keep.add(os.path.basename(json.load(file).get("site.css", "")))
+    for old in glob.glob(os.path.join(OUTPUT_DIR, "site.*.css*")):
+        if os.path.basename(old).partition(".css")[0] + ".css" not in keep:
+            os.remove(old)
+
+    path = os.path.join(OUTPUT_DIR, name)
+    with open(path, "wb") as file:
+        file.write(data)
+    with open(path + ".gz", "wb") as file:
+        file.write(gzip.compress(data, compresslevel=9, mtime=0))  # mtime=0 keeps builds reproducible
+    if brotli is not None:
+        with open(path + ".br", "wb") as file:
+            file.write(brotli.compress(data, quality=11))
+
+    with open(MANIFEST, "w") as file:
+        json.dump({"site.css": f"css/{name}"}, file, indent=2)
+        file.write("\n")
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=TAILWIND_CDN_URL, help="Tailwind CSS file or URL (default: the CDN copy)")
+    args = parser.parse_args()
+
+    source = read_source(args.source)
+    used = template_classes(os.path.join(SITE_DIR, TEMPLATE_FOLDER))
+    css = minify(drop_unused_keyframes(purge(minify(source), used)))
+    name = write_bundle(css)
+
+    sizes = [f"{len(source.encode()):,} bytes source", f"{len(css.encode()):,} purged",
+             f"{os.path.getsize(os.path.join(OUTPUT_DIR, name + '.gz')):,} gzip"]
+    if brotli is not None:
+        sizes.append(f"{os.path.getsize(os.path.join(OUTPUT_DIR, name + '.br')):,} brotli")
+    else:
+        sizes.append("no brotli (pip install brotli)")
+    print(f"Wrote static/css/{name}: " + ", ".join(sizes))
+
+
+if __name__ == "__main__":
+    main()
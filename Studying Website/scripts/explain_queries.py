@@ -0,0 +1,80 @@
+"""
+Prints SQLite's EXPLAIN QUERY PLAN for the queries behind each route so a
+missing or unused index shows up as a "SCAN" instead of a "SEARCH ... USING INDEX".
+
+Usage (from the Studying Website folder):
+    python scripts/explain_queries.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, Deadline, DeadlineStats, History, HistoryRollup, Notification, User  # noqa: E402
+
+USER_ID = 1
+TODAY = date.today()
+TOMORROW = TODAY + timedelta(days=1)
+
+
+def route_queries():
+    """Returns (label, statement) pairs mirroring the queries issued by app.py."""
+    return [
+        ("dashboard: progress counters",
+         db.select(DeadlineStats).where(DeadlineStats.user_id == USER_ID)),
+        ("dashboard: unread reminders",
+         db.select(Notification).where(Notification.user_id == USER_ID, Notification.read.is_(False),
+                                       Notification.due_date >= date.today())),
+        ("sweeper: deadlines due today or tomorrow",
+         db.select(Deadline).where(Deadline.due_date.between(TODAY, TOMORROW), Deadline.notified.is_(False))),
+        ("calendar: next page",
+         db.select(Deadline).where(Deadline.user_id == USER_ID, db.tuple_(Deadline.due_date, Deadline.id) > (TOMORROW, 1))
+         .order_by(Deadline.due_date, Deadline.id).limit(51)),
+        ("calendar: priority filter",
+         db.select(Deadline).where(Deadline.user_id == USER_ID, Deadline.priority == "High")
+         .order_by(Deadline.due_date, Deadline.id).limit(51)),
+        ("calendar: priority progress",
+         db.select(db.func.count(Deadline.id)).where(Deadline.user_id == USER_ID, Deadline.priority == "High")),
+        ("mark_completed: lookup",
+         db.select(Deadline).where(Deadline.id == 1, Deadline.user_id == USER_ID)),
+        ("mark_completed: archive",
+         db.select(Deadline).where(Deadline.user_id == USER_ID, Deadline.completed.is_(True))),
+        ("history: completed deadlines",
+         db.select(History).where(History.user_id == USER_ID)
+         .order_by(History.completed_on.desc(), History.id.desc()).limit(51)),
+        ("history: monthly summary",
+         db.select(HistoryRollup).where(HistoryRollup.user_id == USER_ID).order_by(HistoryRollup.month.desc())),
+        ("archive-history: rows to move",
+         db.select(History).where(History.user_id == USER_ID, History.completed_on < date.today())
+         .order_by(History.completed_on, History.id)),
+        ("leaderboard: top users",
+         db.select(User.id, User.name, User.points).order_by(User.points.desc(), User.id).limit(10)),
+        ("leaderboard: ranking reload",
+         db.select(User.points, db.func.count(User.id)).group_by(User.points)),
+    ]
+
+
+def explain(statement):
+    """Runs EXPLAIN QUERY PLAN for a statement and returns the plan lines."""
+    compiled = statement.compile(dialect=db.engine.dialect)
+    params = tuple(
+        value.isoformat() if isinstance(value, date) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        for label, statement in route_queries():
+            print(f"== {label}")
+            for line in explain(statement):
+                print(f"   {line}")
+
+
+if __name__ == "__main__":
+    main()
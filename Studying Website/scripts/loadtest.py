@@ -0,0 +1,284 @@
+"""
+Synthetic-data load test for the Studying Website.
+
+Seeds a database with users, deadlines and history rows, then drives a
+weighted mix of the site's routes from many threads. It reports p50/p95/p99
+latency and throughput per route. The results are written as JSON (with the
+git commit and settings) so runs can be compared across commits. A
+readable summary goes to stderr.
+
+Usage (from the Studying Website folder):
+    python scripts/loadtest.py --users 500 --deadlines 40 --history 200 --threads 8 --seconds 20 --output run.json
+    python scripts/loadtest.py --url http://127.0.0.1:5001 --database users.db --no-seed  # against a running server
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+
+SITE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SITE_DIR)
+
+PASSWORD = "loadtest-password"
+PRIORITIES = ["High", "Medium", "Low"]
+
+# (name, weight); names are the view functions they exercise
+ROUTE_MIX = [
+    ("dashboard", 30),
+    ("calendar", 20),
+    ("calendar_api", 8),
+    ("history", 10),
+    ("leaderboard", 5),
+    ("add_deadline", 10),
+    ("mark_completed", 12),
+    ("login", 5),
+]
+
+
+def seed(app, db, models, users, deadlines_per_user, history_per_user, rounds):
+    """Fills an empty database. Every user shares one password hash so seeding stays fast."""
+    from passwords import hash_password
+
+    User, Deadline, DeadlineStats, History = models
+    rng = random.Random(42)
+    today = date.today()
+    hashed = hash_password(PASSWORD, rounds)
+    batch_size = 10000
+
+    def insert(table, rows):
+        for i in range(0, len(rows), batch_size):
+            db.session.execute(db.insert(table), rows[i:i + batch_size])
+
+    with app.app_context():
+        db.create_all()
+        insert(User.__table__, [
+            {"id": u, "name": f"Student {u}", "email": f"student{u}@example.com", "password": hashed,
+             "points": rng.randrange(0, 600, 5), "rank": "Unranked"}
+            for u in range(1, users + 1)
+        ])
+        insert(Deadline.__table__, [
+            {"user_id": u, "title": f"Task {n}", "due_date": today + timedelta(days=rng.randint(-30, 120)),
+             "completed": False, "priority": rng.choice(PRIORITIES), "notified": False}
+            for u in range(1, users + 1) for n in range(deadlines_per_user)
+        ])
+        insert(DeadlineStats.__table__, [
+            {"user_id": u, "total": deadlines_per_user, "completed": 0, "version": 0} for u in range(1, users + 1)
+        ])
+        insert(History.__table__, [
+            {"user_id": u, "title": f"Old task {n}", "due_date": today - timedelta(days=rng.randint(1, 700)),
+             "priority": rng.choice(PRIORITIES),
+             "completed_on": datetime.combine(today, datetime.min.time()) - timedelta(days=rng.randint(0, 700))}
+            for u in range(1, users + 1) for n in range(history_per_user)
+        ])
+        db.session.commit()
+        from app import ensure_indexes
+        ensure_indexes()
+
+
+class TestClientDriver:
+    """Sends requests through Flask's test client; logs in by writing the session directly."""
+
+    def __init__(self, app, user_id):
+        self.client = app.test_client()
+        self.user_id = user_id
+        with self.client.session_transaction() as session:
+            session["user_id"] = user_id
+            session["user_name"] = f"Student {user_id}"
+
+    def get(self, path):
+        response = self.client.get(path)
+        response.get_data()  # Drain streamed bodies so they are timed in full
+        return response.status_code
+
+    def post(self, path, data):
+        return self.client.post(path, data=data).status_code
+
+
+class HttpDriver:
+    """Sends requests to a running server, logging in once with the seeded password."""
+
+    def __init__(self, base_url, user_id):
+        self.base_url = base_url.rstrip("/")
+        self.user_id = user_id
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+        self.post("/login", {"email": f"student{user_id}@example.com", "password": PASSWORD})
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data):
+        return self._open(urllib.request.Request(self.base_url + path, data=urllib.parse.urlencode(data).encode()))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # Report the 302 itself, as the test client does
+
+
+def run_operation(driver, route, rng, deadlines_per_user):
+    """Performs one request for the route and returns its status code."""
+    user_id = driver.user_id
+    if route == "dashboard":
+        return driver.get("/dashboard")
+    if route == "calendar":
+        return driver.get("/calendar" + rng.choice(["", "?priority=High", "?page_size=20"]))
+    if route == "calendar_api":
+        month = date.today().replace(day=1) + timedelta(days=31 * rng.randint(0, 3))
+        return driver.get(f"/api/calendar?month={month:%Y-%m}")
+    if route == "history":
+        return driver.get("/history")
+    if route == "leaderboard":
+        return driver.get("/leaderboard")
+    if route == "add_deadline":
+        due = date.today() + timedelta(days=rng.randint(1, 90))
+        return driver.post("/add_deadline", {"title": "Load test task", "due_date": due.isoformat(),
+                                             "priority": rng.choice(PRIORITIES)})
+    if route == "mark_completed":
+        # Seeded deadlines are numbered in blocks of deadlines_per_user per user
+        first_id = (user_id - 1) * deadlines_per_user + 1
+        return driver.post(f"/mark_completed/{rng.randint(first_id, first_id + deadlines_per_user - 1)}", {})
+    if route == "login":
+        return driver.post("/login", {"email": f"student{user_id}@example.com", "password": PASSWORD})
+    raise ValueError(route)
+
+
+def worker(make_driver, users, deadlines_per_user, stop, results, lock, seed_value):
+    rng = random.Random(seed_value)
+    routes, weights = zip(*ROUTE_MIX)
+    driver = make_driver(rng.randint(1, users))
+    samples = {}
+    while not stop.is_set():
+        route = rng.choices(routes, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = run_operation(driver, route, rng, deadlines_per_user)
+        except Exception:
+            status = 599
+        elapsed = time.perf_counter() - start
+        samples.setdefault(route, []).append((elapsed, status))
+    with lock:
+        for route, values in samples.items():
+            results.setdefault(route, []).extend(values)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, seconds):
+    routes = {}
+    for route, samples in sorted(results.items()):
+        latencies = sorted(elapsed for elapsed, _ in samples)
+        routes[route] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, status in samples if status >= 400),
+            "throughput_rps": round(len(samples) / seconds, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {"total_requests": total, "total_throughput_rps": round(total / seconds, 2), "routes": routes}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SITE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--deadlines", type=int, default=30, help="deadlines per user")
+    parser.add_argument("--history", type=int, default=100, help="history rows per user")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt work factor for seeded passwords")
+    parser.add_argument("--database", help="SQLite file to seed/use (default: a temporary file)")
+    parser.add_argument("--no-seed", action="store_true", help="use an already seeded database")
+    parser.add_argument("--url", help="drive a running server instead of the test client")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="loadtest-")
+    database = os.path.abspath(args.database or os.path.join(folder, "users.db"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+    from app import app, db, password_hasher, Deadline, DeadlineStats, History, User
+    password_hasher.rounds = args.rounds  # Match the seeded hashes so logins are not rehashed
+
+    if not args.no_seed:
+        print(f"Seeding {database} ...", file=sys.stderr)
+        seed(app, db, (User, Deadline, DeadlineStats, History), args.users, args.deadlines, args.history, args.rounds)
+
+    if args.url:
+        def make_driver(user_id):
+            return HttpDriver(args.url, user_id)
+    else:
+        def make_driver(user_id):
+            return TestClientDriver(app, user_id)
+
+    results, lock, stop = {}, threading.Lock(), threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(make_driver, args.users, args.deadlines, stop, results, lock, n))
+        for n in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "db_profile": app.config["DB_PROFILE"],
+        **summarize(results, elapsed),
+    }
+
+    print(f"{'route':<16}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}", file=sys.stderr)
+    for route, r in report["routes"].items():
+        print(f"{route:<16}{r['requests']:>9}{r['errors']:>8}{r['throughput_rps']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()